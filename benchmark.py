@@ -0,0 +1,282 @@
+import argparse
+import contextlib
+import io
+import json
+import matplotlib
+import numpy as np
+import os
+import platform
+import sys
+import tempfile
+import time
+
+matplotlib.use('Agg') # Before pyplot is imported, so nothing here needs a display.
+
+import matplotlib.pyplot as plt
+import pandas as pd
+import plotter
+
+from matplotlib.backend_bases import MouseEvent
+
+
+# Columns shaped like a controller log: (name, amplitude, noise). The ':N' suffixes pick the axis, ':0' columns are ignored.
+SYNTHETIC_COLUMNS = [
+    ('Current Position', 4000, 2), ('Target Position', 4000, 0), ('Current Speed:2', 300, 3), ('Target Speed:2', 300, 0),
+    ('Error', 50, 2), ('Integral', 800, 1), ('Diag:0', 1, 1), ('Speed Error:2', 40, 3), ('Integral Speed:2', 600, 1),
+    ('Diag2:0', 1, 1), ('P Term:3', 500, 5), ('I Term:3', 300, 1), ('D Term:3', 100, 10), ('F Term:3', 200, 0),
+    ('P Speed Term:3', 500, 5), ('I Speed Term:3', 300, 1), ('D Speed Term:3', 100, 10), ('output:4', 1000, 5), ('current:4', 20, 1),
+]
+DEFAULT_ROWS = [10 ** 4, 10 ** 5, 10 ** 6]
+GENERATE_CHUNK_ROWS = 10 ** 6 # Rows generated and written at a time, so even 10^8 rows never have to fit in memory.
+HOVER_SAMPLES = 2000 # Cursor positions looked up when timing customCoordFormatter.
+CLICK_SAMPLES = 50 # Clicks dispatched when timing onClick.
+
+
+#----------------------------------------------- SYNTHETIC DATA -----------------------------------------------
+
+
+def generateCsv(filename, num_rows, seed=0):
+    """
+    Writes a synthetic controller log: an index, a tick column in milliseconds and slow sine waves with noise for every other column.
+
+    Args:
+        filename:   The name of the CSV file to write.
+        num_rows:   Number of data rows.
+        seed:       Seed of the noise, so the same file is generated every time.
+    """
+    rng = np.random.default_rng(seed)
+    columns = ['Index', 'Tick'] + [name for name, _, _ in SYNTHETIC_COLUMNS]
+    with open(filename, 'w', newline='') as f:
+        f.write(','.join(columns) + '\n')
+        for start in range(0, num_rows, GENERATE_CHUNK_ROWS):
+            index = np.arange(start, min(start + GENERATE_CHUNK_ROWS, num_rows))
+            tick = index * 2
+            data = {'Index': index, 'Tick': tick}
+            for x, (name, amplitude, noise) in enumerate(SYNTHETIC_COLUMNS):
+                data[name] = amplitude * np.sin(tick / 50000.0 * (x + 1))
+                if noise:
+                    data[name] += rng.normal(0, noise, len(index))
+            pd.DataFrame(data).to_csv(f, header=False, index=False, float_format='%.3f')
+
+
+def getSyntheticFile(data_dir, num_rows):
+    """
+    Returns the synthetic log with num_rows rows in data_dir, generating it the first time.
+
+    Args:
+        data_dir:   Directory holding the generated files.
+        num_rows:   Number of data rows.
+
+    Returns:
+        The name of the CSV file.
+    """
+    filename = os.path.join(data_dir, f"synthetic_{num_rows}.csv")
+    if not os.path.isfile(filename):
+        print(f"Generating {num_rows} rows in {filename}")
+        os.makedirs(data_dir, exist_ok=True)
+        generateCsv(filename + '.tmp', num_rows)
+        os.replace(filename + '.tmp', filename)
+    return filename
+
+
+#----------------------------------------------- STAGES -----------------------------------------------
+
+
+def timeCall(function, *args, **kwargs):
+    """
+    Calls a function with its printed output suppressed.
+
+    Returns:
+        Tuple of the return value and the elapsed seconds.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        return result, time.perf_counter() - start
+
+
+def summariseLatencies(latencies):
+    """
+    Args:
+        latencies: List of elapsed seconds.
+
+    Returns:
+        Dictionary of the count, mean, p50, p99 and max in milliseconds.
+    """
+    latencies = np.asarray(latencies) * 1000
+    return {
+        'count': len(latencies), 'mean_ms': float(latencies.mean()), 'p50_ms': float(np.percentile(latencies, 50)),
+        'p99_ms': float(np.percentile(latencies, 99)), 'max_ms': float(latencies.max())
+    }
+
+
+def benchmarkStages(filename):
+    """
+    Times each stage of plotting a file on its own: parsing, sorting the columns onto axes, the axis limits, creating the lines and the first draw.
+
+    Args:
+        filename: The name of the CSV file.
+
+    Returns:
+        Tuple of the dictionary of the elapsed seconds of each stage and the parsed DataFrame.
+    """
+    stages = {}
+    df, stages['read_csv'] = timeCall(pd.read_csv, filename)
+    columns = df.columns.values.tolist()
+    num_columns = list(range(len(columns)))
+    axes_cols, stages['identifyAxes'] = timeCall(plotter.identifyAxes, columns)
+    ignore_cols = axes_cols[0]
+    _, stages['loadCsv'] = timeCall(plotter.loadCsv, filename, columns, ignore_cols, use_cache=False)
+    max_abs_values, stages['calculateMaxAbsValues'] = timeCall(plotter.calculateMaxAbsValues, df, columns, num_columns, *axes_cols)
+
+    fig = plt.figure(figsize=plotter.FIGURE_SIZE)
+    axes = plotter.setupAxes(fig, filename)
+    plotter.setZeroAlignedLimits(*axes, max_abs_values)
+    _, stages['plotDataOnAxis'] = timeCall(plotter.plotDataOnAxis, *axes, df, columns, num_columns, plotter.getColumnColours(), *axes_cols, line_data={}, line_columns={})
+    _, stages['first_draw'] = timeCall(fig.canvas.draw)
+    plt.close(fig)
+    return stages, df
+
+
+def benchmarkEvents(filename, df, seed=0):
+    """
+    Opens a file with createPlot and times the hover lookup in customCoordFormatter and the onClick pick, by dispatching clicks on the lines.
+
+    Args:
+        filename:   The name of the CSV file.
+        df:         The parsed DataFrame of the file, for the full resolution data of the hovered line.
+        seed:       Seed of the random cursor positions.
+
+    Returns:
+        Tuple of the createPlot seconds, and the hover and click latency summaries.
+    """
+    rng = np.random.default_rng(seed)
+    _, create_time = timeCall(plotter.createPlot, filename, use_cache=False, show=False)
+    fig = plt.gcf()
+    fig.canvas.draw()
+    ax1 = fig.axes[0]
+    lines = [line for ax in fig.axes[:4] for line in ax.lines if line.get_label() and not line.get_label().startswith('_')]
+
+    # The hover lookup, at random x positions on the full resolution data of a line.
+    line = lines[len(lines) // 2]
+    column_name = next(column for column in df.columns if column.rsplit(':', 1)[0] == line.get_label())
+    line_data = {line: (df['Tick'].to_numpy(dtype=float), df[column_name].to_numpy(), None)}
+    x_min, x_max = ax1.get_xlim()
+    hover_latencies = []
+    for x in rng.uniform(x_min, x_max, HOVER_SAMPLES):
+        start = time.perf_counter()
+        plotter.customCoordFormatter(x, line, line_data)
+        hover_latencies.append(time.perf_counter() - start)
+
+    # Clicks on drawn points of random lines, through the figure's own button_press_event handler.
+    click_latencies = []
+    for _ in range(CLICK_SAMPLES):
+        line = lines[rng.integers(len(lines))]
+        x_data, y_data = line.get_data()
+        point = rng.integers(len(x_data))
+        x, y = line.axes.transData.transform((x_data[point], y_data[point]))
+        event = MouseEvent('button_press_event', fig.canvas, x, y, button=1)
+        start = time.perf_counter()
+        fig.canvas.callbacks.process('button_press_event', event)
+        click_latencies.append(time.perf_counter() - start)
+
+    plt.close(fig)
+    return create_time, summariseLatencies(hover_latencies), summariseLatencies(click_latencies)
+
+
+def runBenchmarks(row_counts, data_dir, repeat=1):
+    """
+    Benchmarks every stage for each size of synthetic log, keeping the best time of the repeats.
+
+    Args:
+        row_counts: List of numbers of rows.
+        data_dir:   Directory holding the generated files.
+        repeat:     Number of times to run each benchmark.
+
+    Returns:
+        Dictionary of the environment and the results of each size.
+    """
+    results = []
+    for num_rows in row_counts:
+        filename = getSyntheticFile(data_dir, num_rows)
+        stages = {}
+        events = None
+        for _ in range(repeat):
+            stage_times, df = benchmarkStages(filename)
+            for name, elapsed in stage_times.items():
+                stages[name] = min(elapsed, stages.get(name, np.inf))
+            create_time, hover, click = benchmarkEvents(filename, df)
+            stages['createPlot'] = min(create_time, stages.get('createPlot', np.inf))
+            if events is None or click['p50_ms'] < events['click']['p50_ms']:
+                events = {'hover': hover, 'click': click}
+
+        results.append({'rows': num_rows, 'file_bytes': os.path.getsize(filename), 'stages': stages, **events})
+        print(f"\n{num_rows} rows:")
+        for name, elapsed in stages.items():
+            print(f"  {name:<24}{elapsed * 1000:12.1f} ms")
+        for name in ('hover', 'click'):
+            print(f"  {name:<24}{events[name]['p50_ms']:12.3f} ms p50{events[name]['p99_ms']:12.3f} ms p99")
+
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'platform': platform.platform(), 'python': platform.python_version(),
+        'numpy': np.__version__, 'pandas': pd.__version__, 'matplotlib': matplotlib.__version__, 'repeat': repeat, 'results': results
+    }
+
+
+def compareResults(old, new):
+    """
+    Prints the time of every stage in two benchmark runs side by side.
+
+    Args:
+        old: Results of the earlier run, loaded from its JSON file.
+        new: Results of the later run.
+    """
+    old_results = {result['rows']: result for result in old['results']}
+    print(f"\n{'Rows':>10}  {'Stage':<24}{'Old ms':>12}{'New ms':>12}{'Change':>10}")
+    for result in new['results']:
+        previous = old_results.get(result['rows'])
+        if previous is None:
+            continue
+        timings = {name: (previous['stages'].get(name), elapsed) for name, elapsed in result['stages'].items()}
+        for name in ('hover', 'click'):
+            timings[f"{name} p50"] = (previous[name]['p50_ms'] / 1000, result[name]['p50_ms'] / 1000)
+        for name, (old_time, new_time) in timings.items():
+            if old_time:
+                print(f"{result['rows']:>10}  {name:<24}{old_time * 1000:>12.2f}{new_time * 1000:>12.2f}{(new_time / old_time - 1) * 100:>+9.0f}%")
+
+
+def parseArguments(argv):
+    """
+    Parses the command line arguments.
+
+    Args:
+        argv: List of command line arguments, excluding the script name.
+
+    Returns:
+        The parsed argparse namespace.
+    """
+    parser = argparse.ArgumentParser(description="Benchmarks loading, plotting and interacting with synthetic controller logs.")
+    parser.add_argument('--rows', nargs='+', type=int, default=DEFAULT_ROWS, help="Numbers of rows to benchmark (default: 10^4 10^5 10^6).")
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'csvplotter_benchmark'), help="Directory for the generated logs, which are reused between runs.")
+    parser.add_argument('--repeat', type=int, default=1, help="Run each benchmark this many times and keep the best (default: 1).")
+    parser.add_argument('--output', default='benchmark.json', help="JSON file to write the results to (default: benchmark.json).")
+    parser.add_argument('--compare', metavar='JSON', help="Results of an earlier run to compare against.")
+    args = parser.parse_args(argv)
+    if args.repeat < 1 or any(rows < 1 for rows in args.rows):
+        parser.error("--repeat and --rows must be at least 1")
+    return args
+
+
+if __name__ == "__main__":
+    args = parseArguments(sys.argv[1:])
+    results = runBenchmarks(args.rows, args.data_dir, args.repeat)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        try:
+            with open(args.compare) as f:
+                compareResults(json.load(f), results)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error comparing with {args.compare} - {e}", file=sys.stderr)
@@ -1,2 +1,2 @@
 @echo off
-python "%~dp0plotter.py" "%1"
\ No newline at end of file
+python "%~dp0plotter_client.py" "%1"
\ No newline at end of file
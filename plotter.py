@@ -1,17 +1,1514 @@
-import matplotlib.pyplot as plt
+import time
+START_TIME = time.perf_counter() # Taken before the other imports, so --profile-startup includes them.
+
+import argparse
+import ast
+import collections
+import concurrent.futures
+import contextlib
+import glob
+import hashlib
+import importlib.util
+import io
+import json
+import mmap
 import matplotlib.ticker as ticker
+import numpy as np
 import os
-import pandas as pd
-import seaborn as sns
+import queue
+import re
+import shutil
+import subprocess
 import sys
+import threading
+import tracemalloc
 
+from matplotlib.colors import to_rgb
+from matplotlib.figure import Figure
 from matplotlib.legend import Legend
 from matplotlib.lines import Line2D
 from matplotlib.widgets import Button
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener
+from plotter_client import AUTH_KEY_FILE, SERVER_ADDRESS, sendFiles
+
+
+LAZY_IMPORT_LOCK = threading.RLock()
+
+
+def lazyImport(name):
+    """
+    Imports a module that is only loaded when one of its attributes is first used, keeping it off the start up path until it is needed.
+
+    Args:
+        name: The name of the module.
+
+    Returns:
+        The lazily loaded module.
+    """
+    with LAZY_IMPORT_LOCK:
+        if name in sys.modules:
+            return sys.modules[name]
+        spec = importlib.util.find_spec(name)
+        loader = importlib.util.LazyLoader(spec.loader)
+        spec.loader = loader
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        loader.exec_module(module)
+        return module
+
+
+def loadModule(module):
+    """
+    Finishes loading a lazily imported module. LazyLoader is not thread safe: a second thread that uses the module while the first
+    is still loading it sees an empty module, so this must be called before the module is used from worker threads.
+
+    Args:
+        module: The module returned by lazyImport.
+
+    Returns:
+        The fully loaded module.
+    """
+    with LAZY_IMPORT_LOCK:
+        module.__name__ # Any attribute access runs the deferred import.
+    return module
+
+
+pd = lazyImport('pandas') # Only needed once a file is read.
 
 
 MARGIN_FACTOR = 1.05
 
+# Colour palette for each plot line, taken from the matplotlib tab20, tab20b, tab20c, Set1 and Dark2 palettes.
+# If you want to customise another column, you must add in its ID and colour, otherwise it will be set to the default colour.
+COLUMN_COLOURS = {
+    2: '#ff7f0e',    # Orange - Current Position (tab20 2)
+    3: '#2ca02c',    # Green - Target Position (tab20 4)
+    4: '#ff7f0e',    # Orange - Current Speed (tab20 2)
+    5: '#2ca02c',    # Green - Target Speed (tab20 4)
+    6: '#d62728',    # Red - Error (tab20 6)
+    7: '#17becf',    # Light Blue - Integral (tab20 18)
+    9: '#d62728',    # Red - Speed Error (tab20 6)
+    10: '#17becf',   # Light Blue - Integral Speed (tab20 18)
+    12: '#6b6ecf',   # Purple - P Term (tab20b 2)
+    13: '#b5cf6b',   # Green - I Term (tab20b 6)
+    14: '#e7ba52',   # Gold - D Term (tab20b 10)
+    15: '#ce6dbd',   # Pink - F Term (tab20b 18)
+    16: '#6baed6',   # Blue - P Speed Term (tab20c 1)
+    17: '#fd8d3c',   # Orange - I Speed Term (tab20c 5)
+    18: '#74c476',   # Green - D Speed Term (tab20c 9)
+    19: '#a65628',   # Brown - Output (Set1 6)
+    20: '#e7298a',   # Purple - Current (Dark2 3)
+}
+FIGURE_SIZE = (17, 9.5)
+POINTS_PER_PIXEL = 2 # Each pixel column of the axis gets its minimum and maximum sample.
+STARTUP_MODULES = ['numpy', 'pandas', 'matplotlib', 'matplotlib.ticker', 'matplotlib.figure', 'matplotlib.legend', 'matplotlib.lines',
+    'matplotlib.widgets', 'matplotlib.pyplot', 'plotter'] # Reported by --profile-startup, in import order.
+STATS_CHUNK_ROWS = 8192 # Rows reduced at a time when calculating column stats, small enough for the block to stay in cache.
+OVERLAY_SHADE = 0.45 # How far the lines of the last overlaid run are darkened towards black, earlier runs are darkened less.
+DIFF_SHADE = -0.5 # How far difference lines are lightened towards white.
+PYRAMID_BASE_BLOCK = 64 # Raw samples per block in the first level of a min/max pyramid.
+PYRAMID_FACTOR = 16 # Blocks of one pyramid level combined into each block of the next.
+SETTLING_BAND = 0.02 # A line has settled once it stays within this fraction of its step of the final value.
+FINAL_VALUE_FRACTION = 0.05 # Fraction of the samples at the end of the zoomed window averaged to find the final value.
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.csvplotter_cache')
+CACHE_MAX_BYTES = 2 * 1024 ** 3 # Least recently used entries are evicted once the cache grows past this size.
+CACHE_MANIFEST = 'manifest.json'
+SESSION_DIR = os.path.join(CACHE_DIR, 'sessions') # View state and precomputed render data of each file, saved when its window is closed.
+SESSION_MAX_BYTES = 256 * 1024 ** 2 # Least recently used sessions are evicted once they grow past this size.
+DTYPE_SAMPLE_ROWS = 1000 # Rows read to decide which columns can be parsed with an explicit numeric dtype.
+DTYPE_ERROR_PATTERN = re.compile(r'could not convert|conversion error|unable to parse', re.IGNORECASE) # Parser errors for a value that does not fit the given dtype.
+STREAM_CHUNK_BYTES = 8 * 1024 ** 2 # Bytes of the file parsed at a time when streaming.
+STREAM_BIN_ROWS = 64 # Rows summarised by each min/max bin of a streamed file, doubled whenever the summary is halved.
+STREAM_MAX_BINS = 65536 # Bins kept per column. Once there are more, neighbouring bins are merged so memory stays fixed.
+STREAM_DETAIL_ROWS = 1000000 # Most rows read back from disk at full resolution when zooming in past the resolution of the summary.
+ROW_INDEX_EVERY = 1024 # Rows between the entries of a row index.
+ROW_INDEX_SUFFIX = '.rowindex.npz' # Appended to the name of a CSV file to name its row index sidecar.
+STREAM_CHUNKS_PER_TICK = 4 # Chunks parsed between each update of the window while streaming.
+ASYNC_CHUNK_ROWS = 200000 # Rows parsed at a time by the background loader, each chunk is drawn as it arrives.
+ASYNC_POLL_INTERVAL = 100 # Milliseconds between checks for rows parsed by the background loader.
+DERIVED_CACHE_BYTES = 256 * 1024 ** 2 # Hidden derived signals are evicted, least recently used first, once the cached ones take more than this.
+DERIVED_REFERENCE = re.compile(r'\{([^{}]+)\}') # A column referenced in a derived signal expression, e.g. {Target Speed}.
+LOAD_ENGINES = ['auto', 'pyarrow', 'split', 'pandas'] # How CSV files are parsed, see readCsv.
+SPLIT_MIN_BYTES = 16 * 1024 ** 2 # Smaller files are parsed on one thread, splitting them costs more than it saves.
+INT16_SCALES = [1, 10, 100, 1000] # Decimal scales tried when storing a column as int16 in low memory mode.
+COMPACT_BLOCK_ROWS = 1024 ** 2 # Rows checked at a time when compacting a column.
+NUMEXPR_FUNCTIONS = {'abs', 'sqrt', 'exp', 'log', 'sin', 'cos', 'where'} # Functions numexpr evaluates itself, if it is installed.
+
+
+#----------------------------------------------- CSV CACHE -----------------------------------------------
+
+
+def getCacheEntryName(filename):
+    """
+    Builds the cache entry name for a file. The first half identifies the path and the second half the file's current version.
+
+    Args:
+        filename: The name of the CSV file.
+
+    Returns:
+        Tuple of the path prefix and the full entry name.
+    """
+    path = os.path.abspath(filename)
+    stat = os.stat(path)
+    path_key = hashlib.sha1(path.encode('utf-8')).hexdigest()[:16]
+    version_key = hashlib.sha1(f"{stat.st_mtime_ns}|{stat.st_size}".encode('utf-8')).hexdigest()[:16]
+    return path_key, f"{path_key}-{version_key}"
+
+
+def readCache(filename, usecols=None, cache_dir=CACHE_DIR):
+    """
+    Loads a previously cached CSV as a dataframe of memory-mapped columns, skipping parsing entirely.
+
+    Args:
+        filename:   The name of the CSV file.
+        usecols:    Optional list of column names to load. The entry is only used if it holds all of them.
+        cache_dir:  Directory holding the cache entries.
+
+    Returns:
+        The cached pandas DataFrame, or None if the file has no up to date cache entry.
+    """
+    _, entry_name = getCacheEntryName(filename)
+    entry_dir = os.path.join(cache_dir, entry_name)
+    manifest_path = os.path.join(entry_dir, CACHE_MANIFEST)
+    if not os.path.isfile(manifest_path):
+        return None
+
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        column_files = dict(zip(manifest['columns'], manifest['files']))
+        usecols = manifest['columns'] if usecols is None else list(usecols)
+        if any(column not in column_files for column in usecols):
+            return None
+        data = {}
+        for column in usecols:
+            data[column] = np.load(os.path.join(entry_dir, column_files[column]), mmap_mode='r')
+        df = pd.DataFrame(data, columns=usecols, copy=False)
+    except Exception as e:
+        print(f"Ignoring unreadable cache entry {entry_name} - {e}", file=sys.stderr)
+        return None
+
+    os.utime(manifest_path) # Mark as recently used for eviction.
+    return df
+
+
+def writeCache(filename, df, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+    """
+    Stores each column of a parsed CSV as a .npy file so later loads can memory-map them. Older versions of the same file are replaced.
+
+    Args:
+        filename:   The name of the CSV file.
+        df:         The parsed pandas DataFrame.
+        cache_dir:  Directory holding the cache entries.
+        max_bytes:  Total cache size to evict down to after writing.
+    """
+    path_key, entry_name = getCacheEntryName(filename)
+    entry_dir = os.path.join(cache_dir, entry_name)
+    temp_dir = f"{entry_dir}.{os.getpid()}.tmp"
+
+    try:
+        os.makedirs(temp_dir, exist_ok=True)
+        files = []
+        for index, column in enumerate(df.columns):
+            values = df[column].to_numpy()
+            if not pd.api.types.is_numeric_dtype(values.dtype):
+                values = values.astype(str) # Store text columns without pickling.
+            column_file = f"{index}.npy"
+            np.save(os.path.join(temp_dir, column_file), values, allow_pickle=False)
+            files.append(column_file)
+
+        # The manifest is written last, an entry without one is never read.
+        manifest = {'source': os.path.abspath(filename), 'columns': [str(column) for column in df.columns], 'files': files}
+        with open(os.path.join(temp_dir, CACHE_MANIFEST), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+
+        # Drop stale versions of this file, then move the new entry into place.
+        for name in os.listdir(cache_dir):
+            if name.startswith(f"{path_key}-") and not name.endswith('.tmp'):
+                shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+        os.replace(temp_dir, entry_dir)
+    except Exception as e:
+        print(f"Error writing cache for {filename} - {e}", file=sys.stderr)
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        return
+
+    evictCache(cache_dir, max_bytes)
+
+
+def evictCache(cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+    """
+    Deletes the least recently used cache entries until the total cache size is within max_bytes.
+
+    Args:
+        cache_dir:  Directory holding the cache entries.
+        max_bytes:  Maximum total size of the cache in bytes.
+    """
+    entries = []
+    for name in os.listdir(cache_dir):
+        entry_dir = os.path.join(cache_dir, name)
+        manifest_path = os.path.join(entry_dir, CACHE_MANIFEST)
+        if name.endswith('.tmp') or not os.path.isfile(manifest_path):
+            continue
+        size = sum(entry.stat().st_size for entry in os.scandir(entry_dir) if entry.is_file())
+        entries.append((os.path.getmtime(manifest_path), size, entry_dir))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, entry_dir in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        total -= size
+
+
+def readCsvHeader(filename):
+    """
+    Reads only the header line of a CSV file.
+
+    Args:
+        filename: The name of the CSV file.
+
+    Returns:
+        List of all column names.
+    """
+    return pd.read_csv(filename, nrows=0).columns.values.tolist()
+
+
+def downcastColumns(df):
+    """
+    Converts numeric columns to float32 where every value survives the conversion exactly, halving their memory.
+
+    Args:
+        df: The pandas DataFrame, modified in place.
+
+    Returns:
+        The same pandas DataFrame.
+    """
+    for column in df.columns:
+        values = df[column].to_numpy()
+        if values.dtype.kind in 'iuf' and values.dtype.itemsize > 4:
+            as_float32 = values.astype(np.float32)
+            if np.array_equal(as_float32, values, equal_nan=values.dtype.kind == 'f'):
+                df[column] = as_float32
+    return df
+
+
+def resolveLoadEngine(engine, filename, workers=None):
+    """
+    Picks the parser for a CSV file. 'auto' uses pyarrow's multithreaded reader if it is installed, otherwise a split parse
+    across threads for files large enough to benefit from it, otherwise the pandas C parser on one thread.
+
+    Args:
+        engine:     One of LOAD_ENGINES.
+        filename:   The name of the CSV file.
+        workers:    Number of parse threads. Defaults to the number of CPU cores.
+
+    Returns:
+        The engine to use: 'pyarrow', 'split' or 'pandas'.
+    """
+    if engine == 'pyarrow' and importlib.util.find_spec('pyarrow') is None:
+        print("pyarrow is not installed, splitting the parse across threads instead.", file=sys.stderr)
+        engine = 'split'
+    if engine == 'auto':
+        if importlib.util.find_spec('pyarrow') is not None:
+            return 'pyarrow'
+        engine = 'split' if os.path.getsize(filename) >= SPLIT_MIN_BYTES else 'pandas'
+    if engine == 'split' and (workers or os.cpu_count() or 1) < 2:
+        return 'pandas'
+    return engine
+
+
+def splitCsvRows(filename, pieces):
+    """
+    Splits the rows of a CSV file into byte ranges of about equal size, each starting and ending on a line boundary.
+
+    Args:
+        filename:   The name of the CSV file.
+        pieces:     Number of ranges to split into.
+
+    Returns:
+        List of (start, stop) byte offsets, after the header line.
+    """
+    size = os.path.getsize(filename)
+    with open(filename, 'rb') as f:
+        bounds = [len(f.readline())]
+        for piece in range(1, pieces):
+            f.seek(max(bounds[0] + (size - bounds[0]) * piece // pieces - 1, bounds[-1]))
+            f.readline() # Skip to the start of the next line.
+            bounds.append(f.tell())
+    bounds.append(size)
+    return [(start, stop) for start, stop in zip(bounds, bounds[1:]) if stop > start]
+
+
+def readCsvSplit(filename, columns, usecols, dtype=None, workers=None):
+    """
+    Parses a CSV file as several byte ranges in parallel threads. The pandas C parser releases the GIL while tokenising,
+    so the pieces parse concurrently, and concatenating them leaves each column as one contiguous array.
+
+    Args:
+        filename:   The name of the CSV file.
+        columns:    List of all column names, from the header.
+        usecols:    List of column indices to parse.
+        dtype:      Optional dtype, or dictionary of column dtypes, to parse the columns as.
+        workers:    Number of parse threads. Defaults to the number of CPU cores.
+
+    Returns:
+        The pandas DataFrame of the parsed columns.
+    """
+    workers = workers or os.cpu_count() or 1
+
+    def readPiece(byte_range):
+        start, stop = byte_range
+        with open(filename, 'rb') as f:
+            f.seek(start)
+            return parseCsvBytes(f.read(stop - start), columns, usecols, dtype)
+
+    loadModule(pd)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        pieces = list(executor.map(readPiece, splitCsvRows(filename, workers)))
+    if not pieces:
+        return pd.read_csv(filename, usecols=usecols, dtype=dtype)
+    return pd.concat(pieces, ignore_index=True)
+
+
+def isDtypeError(error):
+    """
+    Args:
+        error: The exception raised by a CSV parse with explicit column dtypes.
+
+    Returns:
+        Whether the parse failed because a value did not fit its column's dtype, rather than for any other reason.
+    """
+    return isinstance(error, ValueError) and DTYPE_ERROR_PATTERN.search(str(error)) is not None
+
+
+def readCsv(filename, columns, ignore_cols, nrows=None, engine='auto', workers=None):
+    """
+    Parses only the columns that will be plotted, so ignored columns are never materialised.
+
+    Args:
+        filename:       The name of the CSV file.
+        columns:        List of all column names, from the header.
+        ignore_cols:    List of column indices to ignore from plotting.
+        nrows:          Optional number of data rows to read. Partial reads always use the pandas C parser.
+        engine:         One of LOAD_ENGINES, see resolveLoadEngine.
+        workers:        Number of parse threads. Defaults to the number of CPU cores.
+
+    Returns:
+        The pandas DataFrame holding the plotted columns with the smallest faithful dtypes.
+    """
+    ignore_cols = set(ignore_cols)
+    usecols = [x for x in range(len(columns)) if x not in ignore_cols or x == 1] # The tick column is always needed.
+    engine = 'pandas' if nrows is not None else resolveLoadEngine(engine, filename, workers)
+
+    # Parse numeric columns straight to float rather than letting the parser infer each one.
+    sample = pd.read_csv(filename, usecols=usecols, nrows=DTYPE_SAMPLE_ROWS)
+    dtypes = {column: np.float64 for column in sample.columns if pd.api.types.is_numeric_dtype(sample[column])}
+    try:
+        if engine == 'pyarrow':
+            # The pyarrow engine only accepts column names.
+            df = pd.read_csv(filename, usecols=[columns[x] for x in usecols], dtype=dtypes, engine='pyarrow')
+        elif engine == 'split':
+            df = readCsvSplit(filename, columns, usecols, dtypes, workers)
+        else:
+            df = pd.read_csv(filename, usecols=usecols, dtype=dtypes, nrows=nrows)
+    except ValueError as error:
+        if not isDtypeError(error):
+            raise
+        # A column holds text further down than the sample, let pandas infer the types instead.
+        df = pd.read_csv(filename, usecols=usecols, nrows=nrows)
+
+    return downcastColumns(df)
+
+
+def loadCsv(filename, columns, ignore_cols, use_cache=True, nrows=None, window=None, engine='auto'):
+    """
+    Loads the plotted columns of a CSV file into a dataframe, from the binary cache when the file is unchanged since it was last opened.
+
+    Args:
+        filename:       The name of the CSV file.
+        columns:        List of all column names, from the header.
+        ignore_cols:    List of column indices to ignore from plotting.
+        use_cache:      Whether to read from and write to the cache.
+        nrows:          Optional number of data rows to read. Partial reads bypass the cache.
+        window:         Optional (t0, t1) range of ticks. Only the rows inside it are loaded, through the row index if the file is not cached.
+        engine:         One of LOAD_ENGINES, the parser used when the file is not cached.
+
+    Returns:
+        The pandas DataFrame.
+    """
+    use_cache = use_cache and nrows is None
+    if use_cache:
+        usecols = [column for x, column in enumerate(columns) if x not in ignore_cols or x == 1]
+        df = readCache(filename, usecols)
+        if df is not None:
+            print(f"\nLoaded {filename} from cache.")
+            if window is not None:
+                ticks = df[columns[1]].to_numpy()
+                df = df[(ticks >= window[0]) & (ticks <= window[1])].reset_index(drop=True)
+            return df
+
+    if window is not None:
+        return readCsvWindow(filename, columns, ignore_cols, *window)
+
+    df = readCsv(filename, columns, ignore_cols, nrows, engine)
+    if use_cache:
+        writeCache(filename, df)
+    return df
+
+
+#----------------------------------------------- SESSIONS -----------------------------------------------
+
+
+def getSessionNames(filename, session_dir=SESSION_DIR):
+    """
+    Names the session files of a CSV file. There is one session per path, which is replaced whenever the file changes.
+
+    Args:
+        filename:       The name of the CSV file.
+        session_dir:    Directory holding the sessions.
+
+    Returns:
+        Tuple of the JSON view state file name, the .npz render data file name and the current version of the CSV file.
+    """
+    path_key, version = getCacheEntryName(filename)
+    base = os.path.join(session_dir, path_key)
+    return f"{base}.json", f"{base}.npz", version
+
+
+def readSession(filename, columns, session_dir=SESSION_DIR):
+    """
+    Loads the view state and precomputed render data saved when a file was last closed.
+
+    Args:
+        filename:       The name of the CSV file.
+        columns:        List of all column names, from the header. A session saved with different columns is not used.
+        session_dir:    Directory holding the sessions.
+
+    Returns:
+        Tuple of the view state dictionary and a dictionary of the saved arrays, or None if the file has no up to date session.
+    """
+    try:
+        state_name, arrays_name, version = getSessionNames(filename, session_dir)
+        if not os.path.isfile(state_name):
+            return None
+        with open(state_name, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('version') != version or state.get('columns') != columns:
+            # The file has changed since, so neither its view nor its render data apply any more.
+            for name in (state_name, arrays_name):
+                with contextlib.suppress(OSError):
+                    os.remove(name)
+            return None
+        with np.load(arrays_name, allow_pickle=False) as npz:
+            arrays = {key: npz[key] for key in npz.files}
+        os.utime(state_name) # Mark as recently used for eviction.
+    except Exception as e:
+        print(f"Ignoring unreadable session for {filename} - {e}", file=sys.stderr)
+        return None
+    return state, arrays
+
+
+def writeSession(filename, state, arrays, session_dir=SESSION_DIR, max_bytes=SESSION_MAX_BYTES):
+    """
+    Saves the view state and precomputed render data of a file, stamped with its current version and path.
+
+    Args:
+        filename:       The name of the CSV file.
+        state:          JSON serialisable dictionary of the view state.
+        arrays:         Dictionary of named arrays to save alongside it.
+        session_dir:    Directory holding the sessions.
+        max_bytes:      Total size of the sessions to evict down to after writing.
+    """
+    try:
+        state_name, arrays_name, version = getSessionNames(filename, session_dir)
+        os.makedirs(session_dir, exist_ok=True)
+        temp_name = f"{arrays_name}.{os.getpid()}.tmp"
+        with open(temp_name, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(temp_name, arrays_name)
+
+        # The view state is written last, render data without a matching one is never read.
+        temp_name = f"{state_name}.{os.getpid()}.tmp"
+        with open(temp_name, 'w', encoding='utf-8') as f:
+            json.dump(dict(state, version=version, source=os.path.abspath(filename)), f)
+        os.replace(temp_name, state_name)
+    except Exception as e:
+        print(f"Error saving session for {filename} - {e}", file=sys.stderr)
+        return
+
+    evictSessions(session_dir, max_bytes)
+
+
+def evictSessions(session_dir=SESSION_DIR, max_bytes=SESSION_MAX_BYTES):
+    """
+    Deletes the sessions of files that no longer exist, then the least recently used sessions until their total size is within max_bytes.
+
+    Args:
+        session_dir:    Directory holding the sessions.
+        max_bytes:      Maximum total size of the sessions in bytes.
+    """
+    sessions = []
+    for name in os.listdir(session_dir):
+        if not name.endswith('.json'):
+            continue
+        state_name = os.path.join(session_dir, name)
+        session_files = [state_name, f"{state_name[:-len('.json')]}.npz"]
+        try:
+            with open(state_name, 'r', encoding='utf-8') as f:
+                source = json.load(f).get('source')
+        except (OSError, ValueError):
+            source = None
+        if source is None or not os.path.isfile(source):
+            for session_file in session_files:
+                with contextlib.suppress(OSError):
+                    os.remove(session_file)
+            continue
+        size = sum(os.path.getsize(session_file) for session_file in session_files if os.path.isfile(session_file))
+        sessions.append((os.path.getmtime(state_name), size, session_files))
+
+    total = sum(size for _, size, _ in sessions)
+    for _, size, session_files in sorted(sessions):
+        if total <= max_bytes:
+            break
+        for session_file in session_files:
+            with contextlib.suppress(OSError):
+                os.remove(session_file)
+        total -= size
+
+
+#----------------------------------------------- LIVE TAIL -----------------------------------------------
+
+
+class GrowableBuffer:
+    """
+    A preallocated NumPy array that can be appended to in amortised O(1), by doubling its capacity whenever it fills up.
+    """
+
+    def __init__(self, values, dtype=np.float64):
+        """
+        Args:
+            values: Initial values of the buffer.
+            dtype:  The NumPy dtype of the buffer.
+        """
+        self.size = len(values)
+        self.data = np.empty(max(2 * self.size, 1024), dtype=dtype)
+        self.data[:self.size] = values
+
+
+    def append(self, values):
+        """
+        Appends values to the end of the buffer.
+
+        Args:
+            values: Array of values to append.
+        """
+        needed = self.size + len(values)
+        if needed > len(self.data):
+            grown = np.empty(max(needed, 2 * len(self.data)), dtype=self.data.dtype)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size:needed] = values
+        self.size = needed
+
+
+    def view(self):
+        """
+        Returns:
+            Array view of the values in the buffer, without copying.
+        """
+        return self.data[:self.size]
+
+
+    def trim(self):
+        """
+        Releases the spare capacity of the buffer once nothing more will be appended. Views taken before this keep the old array alive.
+        """
+        if len(self.data) > self.size:
+            self.data = self.data[:self.size].copy()
+
+
+def findCompleteLines(filename, chunk_size=1024 ** 2):
+    """
+    Finds the end of the last complete line of a file that may still be being written, so a half written row is never read.
+
+    Args:
+        filename:   The name of the CSV file.
+        chunk_size: Number of bytes to scan at a time.
+
+    Returns:
+        Tuple of the byte offset just after the last newline and the number of complete lines (including the header).
+    """
+    offset = 0
+    num_lines = 0
+    position = 0
+    with open(filename, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            count = chunk.count(b'\n')
+            if count:
+                num_lines += count
+                offset = position + chunk.rindex(b'\n') + 1
+            position += len(chunk)
+    return offset, num_lines
+
+
+def readAppendedRows(filename, offset, columns, usecols):
+    """
+    Parses the complete rows appended to a file since offset.
+
+    Args:
+        filename:   The name of the CSV file.
+        offset:     Byte offset where the unread rows start.
+        columns:    List of all column names, from the header.
+        usecols:    List of column indices to parse.
+
+    Returns:
+        Tuple of a DataFrame of the new rows (None if there are none) and the byte offset to continue from next time.
+    """
+    with open(filename, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() < offset:
+            raise IOError("file was truncated")
+        f.seek(offset)
+        chunk = f.read()
+
+    # Leave any partly written final line for the next read.
+    end = chunk.rfind(b'\n') + 1
+    if end == 0:
+        return None, offset
+    return parseCsvBytes(chunk[:end], columns, usecols), offset + end
+
+
+def parseCsvBytes(data, columns, usecols, dtype=None):
+    """
+    Parses complete rows cut out of the middle of a CSV file.
+
+    Args:
+        data:       Bytes of the rows, without the header.
+        columns:    List of all column names, from the header.
+        usecols:    List of column indices to parse.
+        dtype:      Optional dtype to parse the columns as.
+
+    Returns:
+        The pandas DataFrame of the rows.
+    """
+    return pd.read_csv(io.BytesIO(data), header=None, names=columns, usecols=usecols, dtype=dtype)
+
+
+#----------------------------------------------- ROW INDEX -----------------------------------------------
+
+
+def getRowIndexName(filename):
+    """
+    Returns:
+        File name of the row index sidecar of a CSV file.
+    """
+    return filename + ROW_INDEX_SUFFIX
+
+
+def buildRowIndex(filename, every=ROW_INDEX_EVERY, block_size=64 * 1024 ** 2):
+    """
+    Scans a CSV file once, recording the byte offset and tick of every 'every'th row.
+
+    Args:
+        filename:   The name of the CSV file.
+        every:      Number of rows between index entries.
+        block_size: Number of bytes scanned at a time.
+
+    Returns:
+        Tuple of the int64 array of byte offsets and the float64 array of ticks at them.
+    """
+    offsets = []
+    num_rows = 0
+    position = 0
+    file_size = os.path.getsize(filename)
+    with open(filename, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+
+            # Every newline starts a row, the header's newline starts the first.
+            starts = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == ord('\n')) + position + 1
+            starts = starts[starts < file_size]
+            offsets.append(starts[(-num_rows) % every::every])
+            num_rows += len(starts)
+            position += len(block)
+
+    offsets = np.concatenate(offsets) if offsets else np.empty(0, dtype=np.int64)
+    ticks = np.full(len(offsets), np.nan)
+    if len(offsets):
+        with open(filename, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for x, offset in enumerate(offsets):
+                end = mm.find(b'\n', offset)
+                fields = mm[offset:end if end >= 0 else file_size].split(b',', 2)
+                try:
+                    ticks[x] = float(fields[1])
+                except (IndexError, ValueError):
+                    pass # Left as NaN.
+    return offsets.astype(np.int64), ticks
+
+
+def loadRowIndex(filename, every=ROW_INDEX_EVERY):
+    """
+    Loads the row index of a CSV file from its sidecar, building and saving it first if it is missing or out of date.
+
+    Args:
+        filename:   The name of the CSV file.
+        every:      Number of rows between index entries.
+
+    Returns:
+        Tuple of the byte offsets and the ticks at them.
+    """
+    stat = os.stat(filename)
+    index_name = getRowIndexName(filename)
+    try:
+        with np.load(index_name) as index:
+            if int(index['size']) == stat.st_size and int(index['mtime_ns']) == stat.st_mtime_ns and int(index['every']) == every:
+                return index['offsets'], index['ticks']
+    except (OSError, KeyError, ValueError):
+        pass # Missing or unreadable, rebuild it.
+
+    offsets, ticks = buildRowIndex(filename, every)
+    try:
+        np.savez(index_name, offsets=offsets, ticks=ticks, size=stat.st_size, mtime_ns=stat.st_mtime_ns, every=every)
+    except OSError as e:
+        print(f"Could not save the row index of {filename} - {e}", file=sys.stderr)
+    return offsets, ticks
+
+
+def readTickRange(filename, columns, usecols, t0, t1, row_index=None, dtype=None):
+    """
+    Parses only the rows of a CSV file with ticks in [t0, t1], using the row index to find the bytes that cover them. The ticks must increase through the file.
+
+    Args:
+        filename:   The name of the CSV file.
+        columns:    List of all column names, from the header.
+        usecols:    List of column indices to parse.
+        t0:         First tick of the range.
+        t1:         Last tick of the range.
+        row_index:  Optional (offsets, ticks) from loadRowIndex. Loaded if not given.
+        dtype:      Optional dtype to parse the columns as.
+
+    Returns:
+        The pandas DataFrame of the rows in the range.
+    """
+    offsets, ticks = row_index if row_index is not None else loadRowIndex(filename)
+    if len(offsets) == 0:
+        return pd.DataFrame(columns=[columns[x] for x in usecols])
+    if not isSorted(ticks):
+        raise ValueError("the ticks do not increase through the file, so a range of them cannot be read")
+
+    # Start at the last entry before t0, as rows of t0 may run on from the block before the first entry of t0 when ticks repeat,
+    # and stop at the first entry after t1.
+    first = max(int(np.searchsorted(ticks, t0, side='left')) - 1, 0)
+    last = int(np.searchsorted(ticks, t1, side='right'))
+    with open(filename, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        end = int(offsets[last]) if last < len(offsets) else len(mm)
+        df = parseCsvBytes(mm[int(offsets[first]):end], columns, usecols, dtype)
+
+    tick = df[columns[1]].to_numpy()
+    return df[(tick >= t0) & (tick <= t1)].reset_index(drop=True)
+
+
+def readCsvWindow(filename, columns, ignore_cols, t0, t1):
+    """
+    Parses only the plotted columns of the rows with ticks in [t0, t1], the windowed counterpart of readCsv.
+
+    Args:
+        filename:       The name of the CSV file.
+        columns:        List of all column names, from the header.
+        ignore_cols:    List of column indices to ignore from plotting.
+        t0:             First tick of the window.
+        t1:             Last tick of the window.
+
+    Returns:
+        The pandas DataFrame holding the plotted columns with the smallest faithful dtypes.
+    """
+    ignore_cols = set(ignore_cols)
+    usecols = [x for x in range(len(columns)) if x not in ignore_cols or x == 1] # The tick column is always needed.
+
+    sample = pd.read_csv(filename, usecols=usecols, nrows=DTYPE_SAMPLE_ROWS)
+    dtypes = {column: np.float64 for column in sample.columns if pd.api.types.is_numeric_dtype(sample[column])}
+    row_index = loadRowIndex(filename)
+    try:
+        df = readTickRange(filename, columns, usecols, t0, t1, row_index, dtypes)
+    except ValueError as error:
+        if not isDtypeError(error):
+            raise
+        df = readTickRange(filename, columns, usecols, t0, t1, row_index) # A column holds text further down than the sample.
+
+    return downcastColumns(df)
+
+
+#----------------------------------------------- STREAMING -----------------------------------------------
+
+
+class CsvStream:
+    """
+    Reads a CSV file a chunk at a time into a fixed size min/max summary of each column, so files larger than memory can be plotted.
+    The byte range and ticks of every chunk are kept, so the full resolution rows of any x-range can be read back from disk.
+    """
+
+    def __init__(self, filename, columns, ignore_cols, chunk_bytes=STREAM_CHUNK_BYTES, max_bins=STREAM_MAX_BINS):
+        """
+        Args:
+            filename:       The name of the CSV file.
+            columns:        List of all column names, from the header.
+            ignore_cols:    List of column indices to ignore from plotting.
+            chunk_bytes:    Bytes of the file parsed at a time.
+            max_bins:       Number of bins kept per column before neighbouring bins are merged.
+        """
+        self.filename = filename
+        self.columns = columns
+        self.chunk_bytes = chunk_bytes
+        self.max_bins = max_bins
+        self.bin_rows = STREAM_BIN_ROWS
+        self.file_size = os.path.getsize(filename)
+        with open(filename, 'rb') as f:
+            self.offset = len(f.readline()) # Skip the header.
+
+        # Only numeric columns can be summarised, a sample of the rows decides which ones they are.
+        ignore_cols = set(ignore_cols)
+        usecols = [x for x in range(len(columns)) if x not in ignore_cols or x == 1]
+        sample = pd.read_csv(filename, usecols=usecols, nrows=DTYPE_SAMPLE_ROWS)
+        self.usecols = [x for x in usecols if pd.api.types.is_numeric_dtype(sample[columns[x]])]
+        self.names = [columns[x] for x in self.usecols]
+        self.tick_column = columns[1]
+
+        self.rows = 0
+        self.x_sorted = True
+        self.chunks = [] # (start offset, end offset, first tick, last tick) of every chunk.
+        self.x_first = GrowableBuffer([])
+        self.x_last = GrowableBuffer([])
+        self.counts = GrowableBuffer([], dtype=np.int64)
+        self.mins = {name: GrowableBuffer([]) for name in self.names}
+        self.maxs = {name: GrowableBuffer([]) for name in self.names}
+
+
+    @property
+    def done(self):
+        """
+        Returns:
+            True once the whole file has been read.
+        """
+        return self.offset >= self.file_size
+
+
+    def readNext(self, max_chunks=1):
+        """
+        Parses the next chunks of the file into the summary.
+
+        Args:
+            max_chunks: Maximum number of chunks to parse.
+
+        Returns:
+            Fraction of the file read so far.
+        """
+        with open(self.filename, 'rb') as f:
+            for _ in range(max_chunks):
+                if self.done:
+                    break
+                f.seek(self.offset)
+                data = f.read(self.chunk_bytes)
+                end = len(data)
+                if self.offset + end < self.file_size:
+                    # Stop at the last complete row, reading on if a single row is longer than a chunk.
+                    end = data.rfind(b'\n') + 1
+                    while end == 0:
+                        more = f.read(self.chunk_bytes)
+                        data += more
+                        end = data.rfind(b'\n') + 1 if more else len(data)
+                if data[:end].strip():
+                    self.addChunk(self.offset, data[:end])
+                self.offset += end
+        return min(self.offset / max(self.file_size, 1), 1.0)
+
+
+    def addChunk(self, start, data):
+        """
+        Summarises one chunk of rows as the minimum and maximum of every bin of self.bin_rows rows.
+
+        Args:
+            start:  Byte offset of the chunk in the file.
+            data:   Bytes of the complete rows in the chunk.
+        """
+        chunk = self.parseRows(data)
+        x = chunk[self.tick_column].to_numpy()
+        num_rows = len(x)
+        if num_rows == 0:
+            return
+        if self.x_sorted:
+            self.x_sorted = isSorted(x) and (not self.chunks or self.chunks[-1][3] <= x[0])
+        self.chunks.append((start, start + len(data), x[0], x[-1]))
+
+        # The last bin of the chunk may be short, bins never span two chunks.
+        num_bins = -(-num_rows // self.bin_rows)
+        starts = np.arange(num_bins) * self.bin_rows
+        stops = np.minimum(starts + self.bin_rows, num_rows)
+        self.x_first.append(x[starts])
+        self.x_last.append(x[stops - 1])
+        self.counts.append(stops - starts)
+        padding = num_bins * self.bin_rows - num_rows
+        for name in self.names:
+            y = np.pad(chunk[name].to_numpy(), (0, padding), constant_values=np.nan).reshape(num_bins, self.bin_rows)
+            self.mins[name].append(np.fmin.reduce(y, axis=1))
+            self.maxs[name].append(np.fmax.reduce(y, axis=1))
+        self.rows += num_rows
+
+        if self.x_first.size > self.max_bins:
+            self.mergeBins()
+
+
+    def mergeBins(self):
+        """
+        Halves the number of bins by merging each pair of neighbours, and doubles the rows of the bins made from now on.
+        """
+        def pairs(buffer, fill):
+            values = buffer.view()
+            if len(values) % 2:
+                values = np.append(values, fill if fill is not None else values[-1])
+            return values.reshape(-1, 2)
+
+        self.x_first = GrowableBuffer(pairs(self.x_first, None)[:, 0])
+        self.x_last = GrowableBuffer(pairs(self.x_last, None)[:, 1])
+        self.counts = GrowableBuffer(pairs(self.counts, 0).sum(axis=1), dtype=np.int64)
+        for name in self.names:
+            self.mins[name] = GrowableBuffer(np.fmin.reduce(pairs(self.mins[name], np.nan), axis=1))
+            self.maxs[name] = GrowableBuffer(np.fmax.reduce(pairs(self.maxs[name], np.nan), axis=1))
+        self.bin_rows *= 2
+
+
+    def frame(self):
+        """
+        Returns:
+            DataFrame of the summary, with the minimum then maximum of every bin at its first and last tick.
+        """
+        df = {self.tick_column: np.column_stack((self.x_first.view(), self.x_last.view())).ravel()}
+        for name in self.names:
+            if name != self.tick_column:
+                df[name] = np.column_stack((self.mins[name].view(), self.maxs[name].view())).ravel()
+        return pd.DataFrame(df, columns=self.names)
+
+
+    def countInRange(self, x_min, x_max):
+        """
+        Counts the bins that overlap an x-range, and the rows in them.
+
+        Args:
+            x_min:  Lower bound of the x-range.
+            x_max:  Upper bound of the x-range.
+
+        Returns:
+            Tuple of the number of bins and the number of rows.
+        """
+        overlap = (self.x_last.view() >= x_min) & (self.x_first.view() <= x_max)
+        return int(overlap.sum()), int(self.counts.view()[overlap].sum())
+
+
+    def readRange(self, x_min, x_max):
+        """
+        Reads the full resolution rows of the chunks that overlap an x-range back from the file.
+
+        Args:
+            x_min:  Lower bound of the x-range.
+            x_max:  Upper bound of the x-range.
+
+        Returns:
+            DataFrame of the rows, a little wider than the x-range. None if the ticks are not sorted, as the rows could then be anywhere.
+        """
+        if not self.x_sorted or not self.chunks:
+            return None
+        first_ticks = np.array([chunk[2] for chunk in self.chunks])
+        last_ticks = np.array([chunk[3] for chunk in self.chunks])
+        first = max(int(np.searchsorted(last_ticks, x_min, side='left')), 0)
+        last = min(int(np.searchsorted(first_ticks, x_max, side='right')), len(self.chunks)) - 1
+        if last < first:
+            return None
+        start, end = self.chunks[first][0], self.chunks[last][1]
+        with open(self.filename, 'rb') as f:
+            f.seek(start)
+            data = f.read(end - start)
+        return self.parseRows(data)
+
+
+    def parseRows(self, data):
+        """
+        Parses complete rows of the file as floats.
+
+        Args:
+            data:   Bytes of the rows.
+
+        Returns:
+            DataFrame of the rows. Values that are not numbers are NaN.
+        """
+        try:
+            return parseCsvBytes(data, self.columns, self.usecols, dtype=np.float64)
+        except ValueError as error:
+            if not isDtypeError(error):
+                raise
+        # A column holds text further down than the sample, let pandas infer the types and keep only the numbers.
+        chunk = parseCsvBytes(data, self.columns, self.usecols)
+        return chunk.apply(pd.to_numeric, errors='coerce').astype(np.float64)
+
+
+#----------------------------------------------- BACKGROUND LOADING -----------------------------------------------
+
+
+class BackgroundLoader:
+    """
+    Parses a CSV file a chunk of rows at a time in a background thread, so the window can be shown and used while it loads.
+    Chunks are handed to the GUI thread through a queue, the figure is never touched from the loader thread.
+    """
+
+    def __init__(self, filename, columns, ignore_cols, chunk_rows=ASYNC_CHUNK_ROWS):
+        """
+        Args:
+            filename:       The name of the CSV file.
+            columns:        List of all column names, from the header.
+            ignore_cols:    List of column indices to ignore from plotting.
+            chunk_rows:     Number of rows parsed at a time.
+        """
+        self.filename = filename
+        self.columns = columns
+        self.usecols = [x for x in range(len(columns)) if x not in set(ignore_cols) or x == 1] # The tick column is always needed.
+        self.chunk_rows = chunk_rows
+        self.messages = queue.Queue()
+        self.cancelled = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+
+    def start(self):
+        """
+        Starts parsing in the background thread.
+        """
+        loadModule(pd)
+        self.thread.start()
+
+
+    def cancel(self):
+        """
+        Asks the background thread to stop after the chunk it is parsing.
+        """
+        self.cancelled.set()
+
+
+    def run(self):
+        """
+        Runs in the background thread. Queues ('rows', DataFrame, fraction read) for each chunk, then ('done', None, 1.0),
+        or ('error', message, None) if the file cannot be parsed.
+        """
+        try:
+            sample = pd.read_csv(self.filename, usecols=self.usecols, nrows=DTYPE_SAMPLE_ROWS)
+            dtypes = {column: np.float64 for column in sample.columns if pd.api.types.is_numeric_dtype(sample[column])}
+            rows_read = 0
+            with open(self.filename, 'rb') as f:
+                size = max(os.fstat(f.fileno()).st_size, 1)
+                reader = pd.read_csv(f, usecols=self.usecols, dtype=dtypes, chunksize=self.chunk_rows)
+                coerce = False
+                while True:
+                    try:
+                        chunk = next(reader, None)
+                    except ValueError as error:
+                        if coerce or not isDtypeError(error):
+                            raise
+                        # A column holds text further down than the sample, let pandas infer the types of the remaining rows
+                        # instead. The columns drawn so far are kept as numbers, so the text is read as NaN.
+                        f.seek(0)
+                        reader = pd.read_csv(f, usecols=self.usecols, skiprows=range(1, rows_read + 1), chunksize=self.chunk_rows)
+                        coerce = True
+                        continue
+                    if chunk is None:
+                        break
+                    if self.cancelled.is_set():
+                        return
+                    if coerce:
+                        for column in dtypes:
+                            chunk[column] = pd.to_numeric(chunk[column], errors='coerce').astype(np.float64)
+                    rows_read += len(chunk)
+                    self.messages.put(('rows', chunk, min(f.tell() / size, 1.0)))
+            self.messages.put(('done', None, 1.0))
+        except Exception as e:
+            self.messages.put(('error', str(e), None))
+
+
+    def poll(self):
+        """
+        Collects everything the background thread has queued so far, without waiting. Called from the GUI thread.
+
+        Returns:
+            List of (kind, value, fraction) messages.
+        """
+        messages = []
+        while True:
+            try:
+                messages.append(self.messages.get_nowait())
+            except queue.Empty:
+                return messages
+
+
+#----------------------------------------------- LOW MEMORY -----------------------------------------------
+
+
+class ScaledInt16Column:
+    """
+    A column stored as int16 multiples of 1/scale, for columns with few decimal places and a small range.
+    Slices and single values are converted back to the original dtype when read, so it can stand in for the array in line_data.
+    """
+
+    def __init__(self, values, scale, dtype):
+        """
+        Args:
+            values: Array of the int16 multiples.
+            scale:  The values are divided by this when read.
+            dtype:  The dtype of the original column.
+        """
+        self.values = values
+        self.scale = scale
+        self.dtype = np.dtype(dtype)
+
+
+    def __len__(self):
+        return len(self.values)
+
+
+    def __getitem__(self, key):
+        return (self.values[key] / self.scale).astype(self.dtype)
+
+
+    def __array__(self, dtype=None, copy=None):
+        return self[:] if dtype is None else self[:].astype(dtype)
+
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+
+def compactColumn(values):
+    """
+    Copies a column into the smallest storage that keeps it usable for plotting: int16 scaled by a power of ten when that
+    is lossless, otherwise float32.
+
+    Args:
+        values: Array of the column values.
+
+    Returns:
+        A read-only int16 backed ScaledInt16Column or float32 array, which shares no memory with values.
+    """
+    if values.dtype.kind in 'iuf' and len(values) > 0:
+        for scale in INT16_SCALES:
+            # Converted a block at a time, so checking a long column never needs several float64 copies of it.
+            compact = np.empty(len(values), dtype=np.int16)
+            for start in range(0, len(values), COMPACT_BLOCK_ROWS):
+                block = values[start:start + COMPACT_BLOCK_ROWS]
+                with np.errstate(invalid='ignore'):
+                    scaled = np.rint(block * scale)
+                if not (np.abs(scaled) <= np.iinfo(np.int16).max).all() or not np.array_equal((scaled / scale).astype(values.dtype), block):
+                    break
+                compact[start:start + COMPACT_BLOCK_ROWS] = scaled
+            else:
+                compact.setflags(write=False)
+                return ScaledInt16Column(compact, scale, values.dtype)
+
+    compact = np.array(values, dtype=np.float32)
+    compact.setflags(write=False)
+    return compact
+
+
+def compactLineData(line_data):
+    """
+    Replaces the full resolution data of every line with one shared read-only copy of the ticks and compact copies of the
+    columns, so none of it refers back to the DataFrame any more.
+
+    Args:
+        line_data: Dictionary mapping each Line2D to its (x_data, y_data, x_index) source, modified in place.
+    """
+    shared_x = {}
+    for line, (x_data, y_data, x_index) in line_data.items():
+        if id(x_data) not in shared_x:
+            x_copy = np.array(x_data)
+            x_copy.setflags(write=False)
+            shared_x[id(x_data)] = x_copy
+        line_data[line] = (shared_x[id(x_data)], compactColumn(y_data), x_index)
+
+
+def getLineDataBytes(line_data):
+    """
+    Returns:
+        Number of bytes held by the full resolution data of the lines, counting shared tick arrays once.
+    """
+    arrays = {}
+    for x_data, y_data, _ in line_data.values():
+        arrays[id(x_data)] = x_data.nbytes
+        arrays[id(y_data)] = y_data.nbytes
+    return sum(arrays.values())
+
+
+def getPeakRss():
+    """
+    Returns:
+        The peak resident memory of this process in bytes, or None if it cannot be read on this platform.
+    """
+    if importlib.util.find_spec('resource') is not None:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024 # macOS reports bytes, Linux kilobytes.
+    if sys.platform == 'win32':
+        # Windows has no resource module, the peak working set is read from the process memory counters instead.
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD), ('PeakWorkingSetSize', ctypes.c_size_t),
+                        ('WorkingSetSize', ctypes.c_size_t), ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPagedPoolUsage', ctypes.c_size_t), ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaNonPagedPoolUsage', ctypes.c_size_t), ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        kernel32 = ctypes.WinDLL('kernel32')
+        # Windows 7 and later export it from kernel32, older versions only from psapi.
+        get_memory_info = getattr(kernel32, 'K32GetProcessMemoryInfo', None) or ctypes.WinDLL('psapi').GetProcessMemoryInfo
+        get_memory_info.argtypes = [wintypes.HANDLE, ctypes.POINTER(ProcessMemoryCounters), wintypes.DWORD]
+        get_memory_info.restype = wintypes.BOOL
+        kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        counters = ProcessMemoryCounters(cb=ctypes.sizeof(ProcessMemoryCounters))
+        if get_memory_info(kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize
+    return None
+
+
+#----------------------------------------------- DERIVED SIGNALS -----------------------------------------------
+
+
+def movingAverage(values, window):
+    """
+    Trailing moving average over a number of samples, ignoring NaNs. The first samples average as many as there are so far.
+
+    Args:
+        values: Array of the values.
+        window: Number of samples to average.
+
+    Returns:
+        Array of the averages.
+    """
+    window = max(int(window), 1)
+    valid = np.isfinite(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(valid)))
+    starts = np.maximum(np.arange(1, len(values) + 1) - window, 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (sums[1:] - sums[starts]) / (counts[1:] - counts[starts])
+
+
+def derivative(values, ticks):
+    """
+    Rate of change per second, with ticks in milliseconds.
+    """
+    if len(values) < 2:
+        return np.full(len(values), np.nan)
+    return np.gradient(values, ticks / 1000.0)
+
+
+def integral(values, ticks):
+    """
+    Running trapezoidal integral over seconds, with ticks in milliseconds. NaNs add nothing.
+    """
+    values = np.nan_to_num(values)
+    return np.concatenate(([0.0], np.cumsum((values[1:] + values[:-1]) * np.diff(ticks / 1000.0) / 2)))
+
+
+DERIVED_FUNCTIONS = {
+    'abs': np.abs, 'sqrt': np.sqrt, 'exp': np.exp, 'log': np.log, 'sin': np.sin, 'cos': np.cos,
+    'minimum': np.fmin, 'maximum': np.fmax, 'where': np.where, 'movavg': movingAverage, 'diff': lambda values: np.diff(values, prepend=np.nan)
+}
+DERIVED_TICK_FUNCTIONS = {'ddt': derivative, 'integral': integral} # Also given the ticks of the rows.
+DERIVED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.Call, ast.Name, ast.Load, ast.Constant,
+    ast.operator, ast.unaryop, ast.cmpop
+)
+
+
+def parseDerivedDefinition(text):
+    """
+    Splits a derived signal definition of the form 'Name[:N] = expression'.
+
+    Args:
+        text: The definition.
+
+    Returns:
+        Tuple of the column name and the expression.
+    """
+    name, sep, expression = text.partition('=')
+    if not sep or not name.strip() or not expression.strip():
+        raise ValueError(f"expected 'name = expression', got {text!r}")
+    return name.strip(), expression.strip()
+
+
+def readDerivedFile(filename):
+    """
+    Reads derived signal definitions from a file, one 'Name[:N] = expression' per line. Blank lines and lines starting with '#' are skipped.
+
+    Args:
+        filename: The name of the file.
+
+    Returns:
+        List of (column name, expression) tuples.
+    """
+    with open(filename) as f:
+        return [parseDerivedDefinition(line) for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+
+class DerivedSignals:
+    """
+    Columns computed from expressions over the loaded columns, e.g. 'Speed Error:2 = {Target Speed} - {Current Speed}'.
+    The expressions are compiled once into vectorised NumPy (or numexpr) operations. Results are memoised, and hidden
+    signals are evicted, least recently used first, once the cache is over its memory budget.
+    """
+
+    def __init__(self, definitions, max_bytes=DERIVED_CACHE_BYTES):
+        """
+        Args:
+            definitions:    List of (column name, expression) tuples, in the order they are defined.
+            max_bytes:      Memory budget of the cached results.
+        """
+        self.definitions = list(definitions)
+        self.max_bytes = max_bytes
+        self.compiled = {} # name -> (expression code, referenced columns, whether numexpr evaluates it).
+        self.cache = collections.OrderedDict() # Least recently used first.
+        self.hidden = set()
+        self.numexpr = lazyImport('numexpr') if importlib.util.find_spec('numexpr') is not None else None
+
+
+    @property
+    def names(self):
+        """
+        Returns:
+            List of the derived column names.
+        """
+        return [name for name, _ in self.definitions]
+
+
+    def compile(self, columns):
+        """
+        Resolves the columns each expression references and checks it only uses arithmetic, comparisons and the known functions.
+
+        Args:
+            columns: List of all column names, from the header.
+
+        Raises:
+            ValueError: If an expression references an unknown column or uses anything else.
+        """
+        available = {}
+        for column in columns:
+            available.setdefault(column, column)
+            available.setdefault(column.rsplit(':', 1)[0], column) # Columns can be referenced without their axis suffix.
+
+        for name, expression in self.definitions:
+            references = []
+            def substitute(match):
+                reference = match.group(1).strip()
+                if reference not in available:
+                    raise ValueError(f"{name}: unknown column {{{reference}}}")
+                references.append(available[reference])
+                return f"c{len(references) - 1}"
+            code = DERIVED_REFERENCE.sub(substitute, expression)
+
+            try:
+                tree = ast.parse(code, mode='eval')
+            except SyntaxError as e:
+                raise ValueError(f"{name}: {e.msg} in {expression!r}")
+            calls = set()
+            for node in ast.walk(tree):
+                if not isinstance(node, DERIVED_NODES):
+                    raise ValueError(f"{name}: {type(node).__name__} is not allowed in {expression!r}")
+                if isinstance(node, ast.Call):
+                    if not isinstance(node.func, ast.Name) or node.func.id not in DERIVED_FUNCTIONS.keys() | DERIVED_TICK_FUNCTIONS.keys():
+                        raise ValueError(f"{name}: unknown function in {expression!r}")
+                    calls.add(node.func.id)
+                elif isinstance(node, ast.Name) and not re.fullmatch(r'c\d+', node.id) and node.id not in DERIVED_FUNCTIONS and node.id not in DERIVED_TICK_FUNCTIONS:
+                    raise ValueError(f"{name}: unknown name {node.id!r} in {expression!r}, put column names in braces")
+
+            use_numexpr = self.numexpr is not None and calls <= NUMEXPR_FUNCTIONS
+            self.compiled[name] = (code if use_numexpr else compile(tree, name, 'eval'), references, use_numexpr)
+            available.setdefault(name, name)
+            available.setdefault(name.rsplit(':', 1)[0], name)
+
+
+    def references(self):
+        """
+        Returns:
+            Set of every column referenced by the expressions.
+        """
+        return {reference for _, references, _ in self.compiled.values() for reference in references}
+
+
+    def evaluate(self, name, df, tick_column):
+        """
+        Returns the values of a derived column, from the cache if they have already been calculated.
+
+        Args:
+            name:           The derived column name.
+            df:             The pandas DataFrame of the loaded columns.
+            tick_column:    Name of the tick column, for the functions that need the time of each row.
+
+        Returns:
+            Array of the values, one per row.
+        """
+        if name in self.cache:
+            self.cache.move_to_end(name)
+            return self.cache[name]
+
+        code, references, use_numexpr = self.compiled[name]
+        namespace = {}
+        for x, reference in enumerate(references):
+            namespace[f"c{x}"] = self.evaluate(reference, df, tick_column) if reference in self.compiled else df[reference].to_numpy(dtype=float)
+        if use_numexpr:
+            values = self.numexpr.evaluate(code, local_dict=namespace)
+        else:
+            ticks = df[tick_column].to_numpy(dtype=float)
+            namespace.update(DERIVED_FUNCTIONS)
+            namespace.update({function: lambda values, function=function: DERIVED_TICK_FUNCTIONS[function](values, ticks) for function in DERIVED_TICK_FUNCTIONS})
+            with np.errstate(all='ignore'):
+                values = eval(code, {'__builtins__': {}}, namespace)
+
+        # A constant expression still needs a value for every row.
+        values = np.array(np.broadcast_to(np.asarray(values, dtype=float), (len(df),)))
+        self.cache[name] = values
+        return values
+
+
+    def setHidden(self, name, hidden):
+        """
+        Marks a derived column as hidden, which lets it be evicted, or as shown, which keeps it cached.
+
+        Args:
+            name:   The derived column name.
+            hidden: Whether it is hidden.
+
+        Returns:
+            List of the names evicted to bring the cache back under its budget.
+        """
+        if hidden:
+            self.hidden.add(name)
+        else:
+            self.hidden.discard(name)
+
+        evicted = []
+        cached_bytes = sum(values.nbytes for values in self.cache.values())
+        for cached_name in list(self.cache):
+            if cached_bytes <= self.max_bytes:
+                break
+            if cached_name in self.hidden:
+                cached_bytes -= self.cache.pop(cached_name).nbytes
+                evicted.append(cached_name)
+        return evicted
+
+
+#----------------------------------------------- PLOTTING -----------------------------------------------
+
 
 def identifyAxes(columns):
     """
@@ -107,7 +1604,292 @@ def setupAxes(fig, filename):
     return ax1, ax2, ax3, ax4
 
 
-def calculateMaxAbsValues(df, columns, num_columns, ignore_cols, primary_cols, secondary_cols, tertiary_cols, quaternary_cols):
+def calculateColumnStats(df, column_names, chunk_rows=STATS_CHUNK_ROWS):
+    """
+    Calculates the min, max, absolute max and NaN count of numeric columns in a single pass over the data.
+    Rows are copied a chunk at a time into a contiguous 2-D float block that stays in cache, and all of its columns are reduced at once.
+
+    Args:
+        df:             The pandas DataFrame object.
+        column_names:   List of column names to calculate. Missing and non-numeric columns are skipped.
+        chunk_rows:     Number of rows reduced at a time.
+
+    Returns:
+        Dictionary mapping column names to a dictionary of their 'min', 'max', 'abs_max', 'nan_count' and 'count'. The values are NaN for columns with no numbers.
+    """
+    names = [name for name in column_names if name in df.columns and pd.api.types.is_numeric_dtype(df[name])]
+    arrays = [df[name].to_numpy() for name in names]
+    num_rows = len(df)
+    mins = np.full(len(names), np.nan)
+    maxs = np.full(len(names), np.nan)
+    nan_counts = np.zeros(len(names), dtype=np.int64)
+
+    # Column-major, so each column of a chunk is copied and reduced contiguously.
+    block = np.empty((min(chunk_rows, num_rows), len(names)), dtype=np.float64, order='F')
+    for start in range(0, num_rows, chunk_rows):
+        stop = min(start + chunk_rows, num_rows)
+        chunk = block[:stop - start]
+        for i, values in enumerate(arrays):
+            chunk[:, i] = values[start:stop]
+        mins = np.fmin(mins, np.fmin.reduce(chunk, axis=0)) # fmin/fmax skip NaNs.
+        maxs = np.fmax(maxs, np.fmax.reduce(chunk, axis=0))
+        nan_counts += np.isnan(chunk).sum(axis=0)
+
+    abs_maxs = np.fmax(np.abs(mins), np.abs(maxs))
+    return {name: {'min': float(mins[i]), 'max': float(maxs[i]), 'abs_max': float(abs_maxs[i]), 'nan_count': int(nan_counts[i]), 'count': num_rows}
+            for i, name in enumerate(names)}
+
+
+def mergeColumnStats(column_stats, new_stats):
+    """
+    Combines the stats of newly appended rows into the existing per-column stats, without rescanning the existing rows.
+
+    Args:
+        column_stats:   Dictionary of per-column stats from calculateColumnStats, updated in place.
+        new_stats:      Dictionary of per-column stats of the new rows.
+    """
+    for name, new in new_stats.items():
+        old = column_stats.get(name)
+        if old is None:
+            column_stats[name] = dict(new)
+            continue
+        old['min'] = float(np.fmin(old['min'], new['min']))
+        old['max'] = float(np.fmax(old['max'], new['max']))
+        old['abs_max'] = float(np.fmax(old['abs_max'], new['abs_max']))
+        old['nan_count'] += new['nan_count']
+        old['count'] += new['count']
+
+
+def buildMinMaxPyramid(values, base_block=PYRAMID_BASE_BLOCK, factor=PYRAMID_FACTOR):
+    """
+    Builds a pyramid of block-wise minimums and maximums of a column, so the range of any slice of it can be found without scanning it.
+
+    Args:
+        values:     Array of the column values.
+        base_block: Number of samples in each block of the first level.
+        factor:     Number of blocks of one level combined into each block of the next.
+
+    Returns:
+        List of (block_size, mins, maxs) levels, from the smallest block size up. Empty if the column is too short to need one.
+    """
+    pyramid = []
+    block_size = base_block
+    level_min = level_max = np.asarray(values, dtype=np.float64)
+    group = base_block
+    while len(level_min) > group:
+        # Pad the last block with NaN, which fmin/fmax ignore.
+        padded = -(-len(level_min) // group) * group
+        level_min = np.fmin.reduce(np.pad(level_min, (0, padded - len(level_min)), constant_values=np.nan).reshape(-1, group), axis=1)
+        level_max = np.fmax.reduce(np.pad(level_max, (0, padded - len(level_max)), constant_values=np.nan).reshape(-1, group), axis=1)
+        pyramid.append((block_size, level_min, level_max))
+        block_size *= factor
+        group = factor
+    return pyramid
+
+
+def rangeMinMax(values, pyramid, start, stop):
+    """
+    Finds the minimum and maximum of values[start:stop] from its pyramid, only touching the partial blocks at each end of every level.
+
+    Args:
+        values:     Array of the column values.
+        pyramid:    The pyramid from buildMinMaxPyramid for values.
+        start:      First index of the slice.
+        stop:       Index after the end of the slice.
+
+    Returns:
+        Tuple of the minimum and maximum, ignoring NaNs. Both are NaN if the slice has no numbers.
+    """
+    range_min = range_max = np.nan
+    level_min = level_max = values
+    size = 1
+    for block_size, next_min, next_max in pyramid + [(None, None, None)]:
+        if block_size is None:
+            head_end = tail_start = stop # Top level, take everything that is left.
+        else:
+            factor = block_size // size
+            head_end = min(-(-start // factor) * factor, stop)
+            tail_start = max(stop // factor * factor, head_end)
+        for part_start, part_stop in ((start, head_end), (tail_start, stop)):
+            if part_start < part_stop:
+                range_min = np.fmin(range_min, np.fmin.reduce(level_min[part_start:part_stop]))
+                range_max = np.fmax(range_max, np.fmax.reduce(level_max[part_start:part_stop]))
+        if block_size is None:
+            break
+
+        # Whatever is left is made of whole blocks of the next level.
+        start, stop = -(-start // factor), stop // factor
+        if start >= stop:
+            break
+        level_min, level_max, size = next_min, next_max, block_size
+    return float(range_min), float(range_max)
+
+
+class RangeStats:
+    """
+    Answers min, max, mean and RMS queries over any slice of a column in constant time. Prefix sums of the values, their
+    squares and the count of numbers give the mean and RMS, and a sparse table over block minimums and maximums gives the
+    range of the whole blocks of a slice, leaving at most two partial blocks to scan.
+    """
+
+    def __init__(self, values, block_size=PYRAMID_BASE_BLOCK):
+        """
+        Args:
+            values:     Array of the column values.
+            block_size: Number of samples in each block of the sparse table.
+        """
+        self.values = values[:0]
+        self.block_size = block_size
+        # Growable, so appending rows only adds the new entries rather than copying every array.
+        self.sums = GrowableBuffer([0.0])
+        self.squares = GrowableBuffer([0.0])
+        self.counts = GrowableBuffer([0], dtype=np.int64)
+        self.mins = [] # Level k holds the range of 2^k blocks starting at each block.
+        self.maxs = []
+        self.extend(values)
+
+
+    def extend(self, values):
+        """
+        Updates the stats for rows appended to the column, only processing the new rows.
+
+        Args:
+            values: Array of the column values, starting with the values the stats already cover.
+        """
+        old_length = len(self.values)
+        self.values = values
+        data = np.asarray(values[old_length:], dtype=np.float64)
+        finite = np.isfinite(data)
+        clean = np.where(finite, data, 0.0)
+        self.sums.append(self.sums.view()[-1] + np.cumsum(clean))
+        self.squares.append(self.squares.view()[-1] + np.cumsum(clean * clean))
+        self.counts.append(self.counts.view()[-1] + np.cumsum(finite))
+
+        # Summarise the blocks completed by the new rows, then add the entries of each level that now have all their blocks.
+        old_blocks = self.mins[0].size if self.mins else 0
+        num_blocks = len(values) // self.block_size
+        if num_blocks == old_blocks:
+            return
+        blocks = np.asarray(values[old_blocks * self.block_size:num_blocks * self.block_size], dtype=np.float64).reshape(-1, self.block_size)
+        if not self.mins:
+            self.mins.append(GrowableBuffer([]))
+            self.maxs.append(GrowableBuffer([]))
+        self.mins[0].append(np.fmin.reduce(blocks, axis=1))
+        self.maxs[0].append(np.fmax.reduce(blocks, axis=1))
+        level, span = 1, 1
+        while 2 * span <= num_blocks:
+            if level == len(self.mins):
+                self.mins.append(GrowableBuffer([]))
+                self.maxs.append(GrowableBuffer([]))
+            done, size = self.mins[level].size, num_blocks - 2 * span + 1
+            previous_mins, previous_maxs = self.mins[level - 1].view(), self.maxs[level - 1].view()
+            self.mins[level].append(np.fmin(previous_mins[done:size], previous_mins[done + span:size + span]))
+            self.maxs[level].append(np.fmax(previous_maxs[done:size], previous_maxs[done + span:size + span]))
+            level, span = level + 1, span * 2
+
+
+    def minMax(self, start, stop):
+        """
+        Returns:
+            Tuple of the minimum and maximum of values[start:stop], ignoring NaNs. Both are NaN if the slice has no numbers.
+        """
+        start, stop = int(start), int(stop)
+        first_block = -(-start // self.block_size)
+        last_block = stop // self.block_size
+        if first_block >= last_block:
+            part = np.asarray(self.values[start:stop], dtype=np.float64)
+            return float(np.fmin.reduce(part, initial=np.nan)), float(np.fmax.reduce(part, initial=np.nan))
+
+        level = (last_block - first_block).bit_length() - 1
+        mins, maxs = self.mins[level].view(), self.maxs[level].view()
+        range_min = np.fmin(mins[first_block], mins[last_block - (1 << level)])
+        range_max = np.fmax(maxs[first_block], maxs[last_block - (1 << level)])
+        for part_start, part_stop in ((start, first_block * self.block_size), (last_block * self.block_size, stop)):
+            if part_start < part_stop:
+                part = np.asarray(self.values[part_start:part_stop], dtype=np.float64)
+                range_min = np.fmin(range_min, np.fmin.reduce(part))
+                range_max = np.fmax(range_max, np.fmax.reduce(part))
+        return float(range_min), float(range_max)
+
+
+    def mean(self, start, stop):
+        """
+        Returns:
+            Tuple of the mean and RMS of the numbers in values[start:stop]. Both are NaN if it has none.
+        """
+        sums, squares, counts = self.sums.view(), self.squares.view(), self.counts.view()
+        count = counts[stop] - counts[start]
+        if count == 0:
+            return np.nan, np.nan
+        mean = (sums[stop] - sums[start]) / count
+        return float(mean), float(np.sqrt(max((squares[stop] - squares[start]) / count, 0.0)))
+
+
+    def summarise(self, x_data, start, stop):
+        """
+        Calculates the stats of values[start:stop] for tuning a control loop. The response is taken as a step from the first
+        sample to the mean of the last FINAL_VALUE_FRACTION of the samples.
+
+        Args:
+            x_data: Array of the ticks of the values, in milliseconds.
+            start:  First index of the slice.
+            stop:   Index after the end of the slice.
+
+        Returns:
+            Dictionary of the 'rows', 'min', 'max', 'mean', 'rms', 'overshoot' (percent of the step) and 'settling' (milliseconds
+            from the start of the slice until it stays within SETTLING_BAND of the final value). NaN where they are undefined.
+        """
+        stats = {'rows': stop - start, 'min': np.nan, 'max': np.nan, 'mean': np.nan, 'rms': np.nan, 'overshoot': np.nan, 'settling': np.nan}
+        if start >= stop:
+            return stats
+        stats['min'], stats['max'] = self.minMax(start, stop)
+        stats['mean'], stats['rms'] = self.mean(start, stop)
+
+        initial = float(self.values[start])
+        final, _ = self.mean(max(stop - max(int((stop - start) * FINAL_VALUE_FRACTION), 1), start), stop)
+        step = final - initial
+        if not np.isfinite(step) or step == 0:
+            return stats
+        peak = stats['max'] - final if step > 0 else final - stats['min']
+        stats['overshoot'] = max(peak, 0.0) / abs(step) * 100
+
+        # Binary search for the first sample from which the rest of the slice stays in the band, the range of a suffix only grows as it starts earlier.
+        band = abs(step) * SETTLING_BAND
+        low, high = start, stop
+        while low < high:
+            middle = (low + high) // 2
+            range_min, range_max = self.minMax(middle, stop)
+            if range_min >= final - band and range_max <= final + band:
+                high = middle
+            else:
+                low = middle + 1
+        if low < stop:
+            stats['settling'] = float(x_data[low] - x_data[start])
+        return stats
+
+
+def formatRangeStats(label, stats):
+    """
+    Formats the stats of the zoomed window of a line for the stats panel.
+
+    Args:
+        label:  The legend label of the line.
+        stats:  Dictionary from RangeStats.summarise.
+
+    Returns:
+        The panel text.
+    """
+    def number(value, suffix=''):
+        return f"{value:.4g}{suffix}" if np.isfinite(value) else "-"
+    return (
+        f"{label}: {stats['rows']} rows in view\n"
+        f"Min {number(stats['min'])}   Max {number(stats['max'])}\n"
+        f"Mean {number(stats['mean'])}   RMS {number(stats['rms'])}\n"
+        f"Overshoot {number(stats['overshoot'], '%')}   Settling {number(stats['settling'], ' ms')}"
+    )
+
+
+def calculateMaxAbsValues(df, columns, num_columns, ignore_cols, primary_cols, secondary_cols, tertiary_cols, quaternary_cols, column_stats=None):
     """
     Calculates the maximum absolute values for the primary, secondary, tertiary, and quaternary axes. This aligns all axes at the zero point.
 
@@ -120,35 +1902,211 @@ def calculateMaxAbsValues(df, columns, num_columns, ignore_cols, primary_cols, s
         secondary_cols:     List of column indices for the secondary axis.
         tertiary_cols:      List of column indices for the tertiary axis.
         quaternary_cols:    List of column indices for the quaternary axis.
+        column_stats:       Optional dictionary of cached per-column stats. Columns missing from it are calculated and added, so later calls reuse them.
 
     Returns:
         Tuple of max absolute values for all axes.
     """
     max_vals = {'primary': 0, 'secondary': 0, 'tertiary': 0, 'quaternary': 0}
+    if column_stats is None:
+        column_stats = {}
+
+    # Look up the axis of each column in O(1). Later groups take precedence, matching the order the axes are checked in when plotting.
+    column_axes = {}
+    for axis_name, axis_cols in (('primary', primary_cols), ('quaternary', quaternary_cols), ('tertiary', tertiary_cols), ('secondary', secondary_cols)):
+        column_axes.update(dict.fromkeys(axis_cols, axis_name))
+    ignore_cols = set(ignore_cols)
+    plot_cols = [x for x in num_columns if x not in ignore_cols]
+
+    # Calculate every column not already cached in one pass.
+    missing = [columns[x] for x in plot_cols if columns[x] not in column_stats]
+    for column_name in missing:
+        if column_name not in df.columns:
+            print(f"Error calculating max value for {column_name} - column not loaded", file=sys.stderr)
+        elif not pd.api.types.is_numeric_dtype(df[column_name]):
+            print(f"Non-numeric data in {column_name}. Skipping max value.", file=sys.stderr)
+    if missing:
+        column_stats.update(calculateColumnStats(df, missing))
+        for column_name in missing:
+            # Remember columns without numbers too, so they are not looked at again.
+            column_stats.setdefault(column_name, {'min': np.nan, 'max': np.nan, 'abs_max': np.nan, 'nan_count': 0, 'count': 0})
+
+    for x in plot_cols:
+        stats = column_stats.get(columns[x])
+        if stats is None or np.isnan(stats['abs_max']) or x not in column_axes:
+            continue
+        axis_name = column_axes[x]
+        max_vals[axis_name] = max(max_vals[axis_name], stats['abs_max'])
+
+    return max_vals['primary'], max_vals['secondary'], max_vals['tertiary'], max_vals['quaternary']
+
+
+def isSorted(x_data):
+    """
+    Checks whether the x data is monotonically increasing, which allows binary searching it.
+
+    Args:
+        x_data: Array of x values.
+
+    Returns:
+        True if every value is greater than or equal to the one before it.
+    """
+    return len(x_data) < 2 or bool(np.all(x_data[1:] >= x_data[:-1]))
+
+
+def buildXIndex(x_data, x_sorted=None):
+    """
+    Builds the lookup index used to binary search a line's x data. Sorted data is searched directly, anything else through a sorted copy.
+
+    Args:
+        x_data:     Array of x values.
+        x_sorted:   Whether x_data is already known to be sorted, saving the scan that checks it.
+
+    Returns:
+        None if x_data is already sorted, otherwise a tuple of the sorted x values and the order that sorts x_data.
+    """
+    if x_sorted if x_sorted is not None else isSorted(x_data):
+        return None
+    order = np.argsort(x_data, kind='stable')
+    return x_data[order], order
+
+
+def findClosestIndex(x_data, x, x_index=None):
+    """
+    Finds the index of the sample with the x value closest to x in O(log n), without allocating.
+
+    Args:
+        x_data:     Array of x values.
+        x:          The x value to search for.
+        x_index:    The index from buildXIndex for x_data.
+
+    Returns:
+        Index into x_data of the closest sample. Ties go to the earlier sample.
+    """
+    sorted_x = x_data if x_index is None else x_index[0]
+    i = int(np.searchsorted(sorted_x, x))
+    if i >= len(sorted_x):
+        i = len(sorted_x) - 1
+    elif i > 0 and x - sorted_x[i - 1] <= sorted_x[i] - x:
+        i -= 1
+    return i if x_index is None else int(x_index[1][i])
+
+
+def decimateMinMax(x_data, y_data, x_min, x_max, num_bins, x_sorted=True):
+    """
+    Reduces a line to the minimum and maximum sample of each bin inside the visible x-range, so spikes are never lost.
+
+    Args:
+        x_data:     Full resolution x values.
+        y_data:     Full resolution y values.
+        x_min:      Lower bound of the visible x-range.
+        x_max:      Upper bound of the visible x-range.
+        num_bins:   Number of bins to split the visible samples into (normally the axis width in pixels).
+        x_sorted:   Whether x_data is monotonically increasing. If not, the whole line is decimated.
+
+    Returns:
+        Tuple of the decimated x and y arrays.
+    """
+    # Slice out the visible samples, keeping one either side so the line runs off the edge of the axis.
+    if x_sorted:
+        start = max(int(np.searchsorted(x_data, x_min, side='left')) - 1, 0)
+        stop = min(int(np.searchsorted(x_data, x_max, side='right')) + 1, len(x_data))
+    else:
+        start, stop = 0, len(x_data)
+    x_visible = x_data[start:stop]
+    y_visible = y_data[start:stop]
+
+    num_bins = max(int(num_bins), 1)
+    if len(x_visible) <= num_bins * POINTS_PER_PIXEL:
+        return x_visible, y_visible
+
+    # Split into equal sized bins, the remainder goes into one extra bin at the end.
+    bin_size = len(x_visible) // num_bins
+    usable = bin_size * num_bins
+    # argmin/argmax pick any NaN in a bin, so NaNs are ranked last instead. A bin that is all NaN keeps its first (NaN) sample,
+    # which leaves a gap in the line rather than joining the samples either side of it.
+    y_low, y_high = y_visible, y_visible
+    if np.issubdtype(y_visible.dtype, np.floating):
+        nan_mask = np.isnan(y_visible)
+        if nan_mask.any():
+            y_low = np.where(nan_mask, np.inf, y_visible)
+            y_high = np.where(nan_mask, -np.inf, y_visible)
+    offsets = np.arange(num_bins) * bin_size
+    min_indices = y_low[:usable].reshape(num_bins, bin_size).argmin(axis=1) + offsets
+    max_indices = y_high[:usable].reshape(num_bins, bin_size).argmax(axis=1) + offsets
+    indices = [np.column_stack((np.minimum(min_indices, max_indices), np.maximum(min_indices, max_indices))).ravel()]
+    if usable < len(x_visible):
+        indices.append(np.sort([usable + y_low[usable:].argmin(), usable + y_high[usable:].argmax()]))
+
+    # Always keep the end points so the line spans the whole visible range.
+    indices = np.unique(np.concatenate([[0]] + indices + [[len(x_visible) - 1]]))
+    return x_visible[indices], y_visible[indices]
+
+
+def updateDownsampledLines(line_data, xlim):
+    """
+    Re-decimates each line for the visible x-range and the pixel width of its axis. Zooming in therefore reveals the full resolution data.
+
+    Args:
+        line_data:  Dictionary mapping each Line2D to its full resolution (x_data, y_data, x_index) source.
+        xlim:       The visible (x_min, x_max) range. This is passed in because the twin axes only receive new limits after the callbacks of the axis that changed.
+    """
+    x_min, x_max = xlim
+    for line, (x_data, y_data, x_index) in line_data.items():
+        line.set_data(*decimateMinMax(x_data, y_data, x_min, x_max, line.axes.bbox.width, x_index is None))
 
-    for x in num_columns:
-        if x not in ignore_cols:
-            column_name = columns[x]
-            try:
-                # Ensure column is numeric before calculating max/min.
-                if pd.api.types.is_numeric_dtype(df[column_name]):
-                     max_axis_value = max(abs(df[column_name].max()), abs(df[column_name].min()))
-                else:
-                     print(f"Non-numeric data in {column_name}. Skipping max value.", file=sys.stderr)
-                     continue
-            except Exception as e:
-                 print(f"Error calculating max value for {column_name} - {e}", file=sys.stderr)
-                 continue
 
-            if x in secondary_cols: max_vals['secondary'] = max(max_vals['secondary'], max_axis_value)
-            elif x in tertiary_cols: max_vals['tertiary'] = max(max_vals['tertiary'], max_axis_value)
-            elif x in quaternary_cols: max_vals['quaternary'] = max(max_vals['quaternary'], max_axis_value)
-            elif x in primary_cols: max_vals['primary'] = max(max_vals['primary'], max_axis_value)
+def buildPickIndex(line, ax):
+    """
+    Transforms the drawn data of a line to display coordinates once, so later clicks only need to search the points near them.
 
-    return max_vals['primary'], max_vals['secondary'], max_vals['tertiary'], max_vals['quaternary']
+    Args:
+        line:   The Line2D object.
+        ax:     The axis the line is plotted on.
+
+    Returns:
+        Tuple of the (N, 2) array of display coordinates and whether their x values are sorted.
+    """
+    display_coords = ax.transData.transform(line.get_xydata())
+    return display_coords, isSorted(display_coords[:, 0])
+
+
+def distanceToLine(display_coords, x_sorted, point, tolerance):
+    """
+    Calculates the pixel distance from a point to the closest segment of a line, only examining segments within tolerance of it along x.
 
+    Args:
+        display_coords: The (N, 2) array of line vertices in display coordinates, from buildPickIndex.
+        x_sorted:       Whether the x values of display_coords are sorted.
+        point:          The (x, y) display coordinates of the point.
+        tolerance:      Horizontal distance in pixels either side of the point to search.
 
-def plotDataOnAxis(ax1, ax2, ax3, ax4, df, columns, num_columns, column_colours, ignore_cols, primary_cols, secondary_cols, tertiary_cols, quaternary_cols):
+    Returns:
+        The distance in pixels, or infinity if no part of the line is near the point.
+    """
+    if x_sorted:
+        # Binary search the x-window, keeping one vertex either side for the segments that cross into it.
+        start = max(int(np.searchsorted(display_coords[:, 0], point[0] - tolerance, side='left')) - 1, 0)
+        stop = min(int(np.searchsorted(display_coords[:, 0], point[0] + tolerance, side='right')) + 1, len(display_coords))
+        display_coords = display_coords[start:stop]
+    if len(display_coords) == 0:
+        return float('inf')
+    if len(display_coords) == 1:
+        distances = np.hypot(*(display_coords - point).T)
+    else:
+        # Project the point onto each segment and measure to the nearest position along it.
+        starts = display_coords[:-1]
+        segments = display_coords[1:] - starts
+        lengths_sq = (segments ** 2).sum(axis=1)
+        t = np.divide(((point - starts) * segments).sum(axis=1), lengths_sq, out=np.zeros_like(lengths_sq), where=lengths_sq > 0)
+        nearest = starts + np.clip(t, 0, 1)[:, np.newaxis] * segments
+        distances = np.hypot(*(nearest - point).T)
+
+    distances = distances[np.isfinite(distances)]
+    return float(distances.min()) if len(distances) > 0 else float('inf')
+
+
+def plotDataOnAxis(ax1, ax2, ax3, ax4, df, columns, num_columns, column_colours, ignore_cols, primary_cols, secondary_cols, tertiary_cols, quaternary_cols, line_data=None, line_columns=None, overview=None, x_sorted=None):
     """
     Plots the data for each axis.
 
@@ -166,6 +2124,11 @@ def plotDataOnAxis(ax1, ax2, ax3, ax4, df, columns, num_columns, column_colours,
         secondary_cols:     List of column indices for the secondary axis.
         tertiary_cols:      List of column indices for the tertiary axis.
         quaternary_cols:    List of column indices for the quaternary axis.
+        line_data:          Optional dictionary. If given, lines are plotted downsampled and their full resolution data is stored in it.
+        line_columns:       Optional dictionary. If given, the column name of each line is stored in it.
+        overview:           Optional dictionary of column names to the (x, y) data to draw them with when line_data is given,
+                            instead of decimating the whole column.
+        x_sorted:           Whether the tick column is already known to be sorted, see buildXIndex.
 
     Returns:
         Tuple of lists of lines created for each axis.
@@ -175,6 +2138,11 @@ def plotDataOnAxis(ax1, ax2, ax3, ax4, df, columns, num_columns, column_colours,
     tertiary_lines = []
     quaternary_lines = []
     tickMs = columns[1]
+    if line_data is not None:
+        x_full = df[tickMs].to_numpy() # A cached float32 column is used as it is, rather than copied to float64.
+        if not np.issubdtype(x_full.dtype, np.floating):
+            x_full = x_full.astype(float)
+        x_index = buildXIndex(x_full, x_sorted) # Built once, the tick column is shared by every line.
 
     for x in num_columns:
         if x not in ignore_cols:
@@ -188,19 +2156,34 @@ def plotDataOnAxis(ax1, ax2, ax3, ax4, df, columns, num_columns, column_colours,
             line_colour = column_colours.get(x, 'black') # Default line colour to black if it does not exist in the column_colour dictionary.
             label = column_name.rsplit(':', 1)[0] # Strip the axes suffix from the column name for the legend.
             try:
+                if line_data is None:
+                    x_plot, y_plot = df[tickMs], df[column_name]
+                else:
+                    # Plot only what the axis can display, the full data is kept for re-decimating when zooming.
+                    y_full = df[column_name].to_numpy()
+                    if overview and column_name in overview:
+                        x_plot, y_plot = overview[column_name]
+                    else:
+                        x_plot, y_plot = decimateMinMax(x_full, y_full, -np.inf, np.inf, ax1.bbox.width, x_index is None)
+
                 if x in secondary_cols:
-                    line, = ax2.plot(df[tickMs], df[column_name], label=label, linestyle=':', color=line_colour)
+                    line, = ax2.plot(x_plot, y_plot, label=label, linestyle=':', color=line_colour)
                     secondary_lines.append(line)
                 elif x in tertiary_cols:
-                    line, = ax3.plot(df[tickMs], df[column_name], label=label, linestyle='--', color=line_colour)
+                    line, = ax3.plot(x_plot, y_plot, label=label, linestyle='--', color=line_colour)
                     tertiary_lines.append(line)
                 elif x in quaternary_cols:
-                    line, = ax4.plot(df[tickMs], df[column_name], label=label, color=line_colour)
+                    line, = ax4.plot(x_plot, y_plot, label=label, color=line_colour)
                     quaternary_lines.append(line)
                 else:
                     # Plot on primary axis.
-                    line, = ax1.plot(df[tickMs], df[column_name], label=label, color=line_colour)
+                    line, = ax1.plot(x_plot, y_plot, label=label, color=line_colour)
                     primary_lines.append(line)
+
+                if line_data is not None:
+                    line_data[line] = (x_full, y_full, x_index)
+                if line_columns is not None:
+                    line_columns[line] = column_name
             except Exception as e:
                  print(f"Error plotting column: {column_name} - {e}", file=sys.stderr)
 
@@ -217,148 +2200,938 @@ def getLegendProperties():
     return {'fontsize': 9, 'framealpha': 0.8, 'edgecolor': '#666666', 'handlelength': 4, 'handleheight': 1}
 
 
-def customCoordFormatter(x, selected_line):
+def customCoordFormatter(x, selected_line, line_data=None):
     """
     Traces the mouse cursor x position when hovering over a selected line and identifies the value of the closest point.
 
     Args:
         x:              The x-coordinate of the mouse cursor.
         selected_line:  The currently selected Line2D object.
+        line_data:      Optional dictionary of full resolution line data, used instead of the (possibly downsampled) drawn data.
 
     Returns:
         The formatted string to display in the text box.
     """
-    # Only consider the selected line if there is one.
-    if selected_line and selected_line.get_visible():
-        try:
-            x_data = selected_line.get_xdata()
-            y_data = selected_line.get_ydata()
+    # Only consider the selected line if there is one.
+    if selected_line and selected_line.get_visible():
+        try:
+            indexed = bool(line_data) and selected_line in line_data
+            if indexed:
+                x_data, y_data, x_index = line_data[selected_line]
+            else:
+                x_data = np.asarray(selected_line.get_xdata(), dtype=float)
+                y_data = np.asarray(selected_line.get_ydata())
+
+            if len(x_data) > 0:
+                # Find closest point based on x-coordinate, binary searching when the line has a prebuilt index.
+                if indexed:
+                    closest_index = findClosestIndex(x_data, x, x_index)
+                else:
+                    closest_index = int(np.abs(x_data - x).argmin())
+
+                # Get data point coordinates.
+                point_y = y_data[closest_index]
+                if isinstance(point_y, np.generic): point_y = point_y.item() # Plain Python number for the formatting below.
+
+                label = selected_line.get_label().strip().replace('|', '').replace('\n', ' ')
+
+                unit = ""
+                # Use integer formatting only for true ints, else float formatting
+                if isinstance(point_y, int) or (isinstance(point_y, float) and point_y.is_integer()):
+                    value_str = f"{int(point_y):d}"
+                else:
+                    value_str = f"{point_y:.2f}"
+
+                if "Position" in label: unit = ""
+                elif "Speed" in label: unit = ""
+                elif "output" in label: unit = " % Duty Cycle"
+                elif "current" in label: unit = " mA"
+
+                return f"Line: {label}\nValue: {value_str}{unit}"
+
+        except Exception as e:
+            print(f"Formatter error: {e}", file=sys.stderr)
+
+    # Return default string.
+    return "Click a line to view live data"
+
+
+def loadPlotData(filename, use_cache=True, nrows=None, window=None, derived=None, engine='auto'):
+    """
+    Reads the header of a CSV file, works out the axis of each column and loads the columns to plot.
+
+    Args:
+        filename:   The name of the file.
+        use_cache:  Whether to use the binary column cache for faster re-opening.
+        nrows:      Optional number of data rows to read.
+        window:     Optional (t0, t1) range of ticks to load.
+        derived:    Optional DerivedSignals. Its columns are added after those in the file, and any ignored columns they reference are still loaded.
+        engine:     One of LOAD_ENGINES, the parser used when the file is not cached.
+
+    Returns:
+        Tuple of the DataFrame, column names, column indices and the ignore, primary, secondary, tertiary and quaternary column indices.
+        None if the file could not be loaded.
+    """
+    try:
+        # Only the header is read here, the data is parsed once the ignored columns are known.
+        columns = readCsvHeader(filename)
+    except FileNotFoundError:
+        print(f"\nPlotting file not found: {filename}\n", file=sys.stderr)
+        return None
+    except Exception as e:
+        print(f"\nError plotting {filename}: {e}\n", file=sys.stderr)
+        return None
+
+    file_columns = columns
+    if derived is not None:
+        try:
+            derived.compile(columns)
+        except ValueError as e:
+            print(f"\nError in derived signal - {e}\n", file=sys.stderr)
+            return None
+        columns = columns + derived.names
+
+    print(f"\nPlotting file: {filename}\n")
+
+    # Gather column names with data to plot.
+    num_columns = list(range(len(columns)))
+    print(f"Index/Column Name Below:")
+    for x in num_columns:
+        print(f"{x}) {columns[x].strip()}")
+
+    # Work out what axes each column should be on.
+    ignore_cols, primary_cols, secondary_cols, tertiary_cols, quaternary_cols = identifyAxes(columns)
+
+    try:
+        if derived is None:
+            df = loadCsv(filename, columns, ignore_cols, use_cache, nrows, window, engine)
+        else:
+            references = derived.references()
+            load_ignore = [x for x in ignore_cols if x < len(file_columns) and file_columns[x] not in references]
+            df = loadCsv(filename, file_columns, load_ignore, use_cache, nrows, window, engine)
+            for x, column in enumerate(derived.names, len(file_columns)):
+                if x not in ignore_cols:
+                    df[column] = derived.evaluate(column, df, file_columns[1])
+    except Exception as e:
+        print(f"\nError plotting {filename}: {e}\n", file=sys.stderr)
+        return None
+
+    return df, columns, num_columns, ignore_cols, primary_cols, secondary_cols, tertiary_cols, quaternary_cols
+
+
+def getColumnColours():
+    """
+    Returns the colour of each plot line.
+
+    Returns:
+        dict: Dictionary mapping column indices to colours.
+    """
+    return dict(COLUMN_COLOURS)
+
+
+def setZeroAlignedLimits(ax1, ax2, ax3, ax4, max_abs_values):
+    """
+    Sets symmetric Y limits on all axes, which aligns the zero point of every axis.
+
+    Args:
+        ax1:            The primary axis.
+        ax2:            The secondary axis.
+        ax3:            The tertiary axis.
+        ax4:            The quaternary axis.
+        max_abs_values: Tuple of max absolute values for all axes.
+    """
+    min_range = 0.1
+    ax1.set_ylim(-max(max_abs_values[0] * MARGIN_FACTOR, min_range), max(max_abs_values[0] * MARGIN_FACTOR, min_range))
+    ax2.set_ylim(-max(max_abs_values[1] * MARGIN_FACTOR, min_range), max(max_abs_values[1] * MARGIN_FACTOR, min_range))
+    ax3.set_ylim(-max(max_abs_values[2] * MARGIN_FACTOR, min_range), max(max_abs_values[2] * MARGIN_FACTOR, min_range))
+    ax4.set_ylim(-max(max_abs_values[3] * MARGIN_FACTOR, min_range), max(max_abs_values[3] * MARGIN_FACTOR, min_range))
+
+
+def createLegend(fig, ax1, ax2, ax3, ax4, primary_lines, secondary_lines, tertiary_lines, quaternary_lines):
+    """
+    Creates the figure legend, with spacers separating the lines of each axis.
+
+    Args:
+        fig:                The matplotlib figure object.
+        ax1:                The primary axis.
+        ax2:                The secondary axis.
+        ax3:                The tertiary axis.
+        ax4:                The quaternary axis.
+        primary_lines:      List of lines on the primary axis.
+        secondary_lines:    List of lines on the secondary axis.
+        tertiary_lines:     List of lines on the tertiary axis.
+        quaternary_lines:   List of lines on the quaternary axis.
+
+    Returns:
+        Tuple of the legend, all legend lines (including spacers) and the axis of each of them (None for spacers).
+    """
+    # Spaces out the individual axes plot lines.
+    spacer1_line = Line2D([0], [0], color='white', lw=0, label=' ')
+    spacer2_line = Line2D([0], [0], color='white', lw=0, label=' ')
+    spacer3_line = Line2D([0], [0], color='white', lw=0, label=' ')
+
+    # Combine all lines and labels.
+    all_lines = primary_lines + [spacer1_line] + secondary_lines + [spacer2_line] + tertiary_lines + [spacer3_line] + quaternary_lines
+    all_labels = [line.get_label() for line in all_lines]
+
+    # Define all_axes to include the axes for each line.
+    all_axes = ([ax1] * len(primary_lines) + [None] + [ax2] * len(secondary_lines) + [None] + [ax3] * len(tertiary_lines) + [None] + [ax4] * len(quaternary_lines))
+
+    # Create the legend - Call helper directly.
+    legend_properties = getLegendProperties()
+    legend = fig.legend(all_lines, all_labels, fancybox=True, shadow=True, bbox_to_anchor=(0.20, 0.52), **legend_properties)
+
+    return legend, all_lines, all_axes
+
+
+def buildLineRegistry(legend, all_lines, all_axes, line_groups):
+    """
+    Maps every data line to its legend entry, axis and group, so toggling or selecting a line never has to search the legend.
+
+    Args:
+        legend:         The figure legend from createLegend.
+        all_lines:      All legend lines, including spacers, in legend order.
+        all_axes:       The axis of each legend line (None for spacers).
+        line_groups:    Dictionary of group key ('primary', 'secondary', etc.) to the lines in that group.
+
+    Returns:
+        Tuple of the registry, mapping each line to a dictionary of its 'legline', 'legtext', 'axis' and 'group',
+        and a dictionary mapping each legend handle and text back to its line.
+    """
+    group_of_line = {line: group_key for group_key, lines in line_groups.items() for line in lines}
+    registry = {}
+    lined = {}
+    for legline, legtext, line, ax in zip(legend.get_lines(), legend.get_texts(), all_lines, all_axes):
+        if ax is None or not isinstance(line, Line2D):
+            continue # Spacer.
+        registry[line] = {'legline': legline, 'legtext': legtext, 'axis': ax, 'group': group_of_line.get(line)}
+        lined[legline] = line
+        lined[legtext] = line
+    return registry, lined
+
+
+def buildFigure(fig, filename, df, columns, num_columns, ignore_cols, primary_cols, secondary_cols, tertiary_cols, quaternary_cols, line_data=None, line_columns=None, column_stats=None, column_colours=None, profiler=None, overview=None, x_sorted=None):
+    """
+    Draws the axes, lines and legend of a plot onto a figure. This is shared by the interactive window and the batch export.
+
+    Args:
+        fig:                The matplotlib figure object.
+        filename:           The name of the file being plotted (used as the figure title).
+        df:                 The pandas DataFrame.
+        columns:            List of all column names with data to plot.
+        num_columns:        List of column indices.
+        ignore_cols:        List of column indices to ignore from plotting.
+        primary_cols:       List of column indices for the primary axis.
+        secondary_cols:     List of column indices for the secondary axis.
+        tertiary_cols:      List of column indices for the tertiary axis.
+        quaternary_cols:    List of column indices for the quaternary axis.
+        line_data:          Optional dictionary. If given, lines are plotted downsampled and their full resolution data is stored in it.
+        line_columns:       Optional dictionary. If given, the column name of each line is stored in it.
+        column_stats:       Optional dictionary of cached per-column stats, filled in with any that are missing.
+        column_colours:     Optional dictionary mapping column indices to colours. Defaults to getColumnColours().
+        profiler:           Optional StageProfiler to time the axes, limits, lines and legend with.
+        overview:           Optional dictionary of column names to the precomputed (x, y) data to draw them with, see plotDataOnAxis.
+        x_sorted:           Whether the tick column is already known to be sorted, see buildXIndex.
+
+    Returns:
+        Tuple of the four axes, the four lists of lines, all legend lines, the axis of each legend line, the legend and the max absolute values of the axes.
+    """
+    with profileStage(profiler, 'axes'):
+        fig.subplots_adjust(top=0.95, left=0.1)
+        ax1, ax2, ax3, ax4 = setupAxes(fig, filename)
+        if column_colours is None:
+            column_colours = getColumnColours()
+
+    # Calculate the max values and set the limits of the Y axes, this aligns all columns to the zero point.
+    with profileStage(profiler, 'limits'):
+        max_abs_values = calculateMaxAbsValues(df, columns, num_columns, ignore_cols, primary_cols, secondary_cols, tertiary_cols, quaternary_cols, column_stats)
+        setZeroAlignedLimits(ax1, ax2, ax3, ax4, max_abs_values)
+
+    # Get the plot lines for each axis.
+    with profileStage(profiler, 'lines'):
+        primary_lines, secondary_lines, tertiary_lines, quaternary_lines = plotDataOnAxis(ax1, ax2, ax3, ax4, df, columns, num_columns, column_colours,
+            ignore_cols, primary_cols, secondary_cols, tertiary_cols, quaternary_cols, line_data, line_columns, overview, x_sorted
+        )
+
+    with profileStage(profiler, 'legend'):
+        legend, all_lines, all_axes = createLegend(fig, ax1, ax2, ax3, ax4, primary_lines, secondary_lines, tertiary_lines, quaternary_lines)
+    return (ax1, ax2, ax3, ax4), (primary_lines, secondary_lines, tertiary_lines, quaternary_lines), all_lines, all_axes, legend, max_abs_values
+
+
+def exportPlot(filename, output_dir, formats, use_cache=True, window=None, derived_definitions=None, engine='auto'):
+    """
+    Renders a CSV file to image files without opening a window. Runs in the batch export worker processes.
+
+    Args:
+        filename:               The name of the file.
+        output_dir:             Directory to write the images to.
+        formats:                List of file formats to save, e.g. ['png', 'svg', 'pdf'].
+        use_cache:              Whether to use the binary column cache.
+        window:                 Optional (t0, t1) range of ticks to render. Only those rows are read, and the range is added to the image names.
+        derived_definitions:    Optional list of (column name, expression) tuples of derived signals to add.
+        engine:                 One of LOAD_ENGINES, the parser used when the file is not cached.
+
+    Returns:
+        Tuple of the filename, list of files written, elapsed seconds and an error message (None on success).
+    """
+    start_time = time.perf_counter()
+    outputs = []
+    try:
+        # The column listings of every file would interleave between workers, so they are only kept for errors.
+        with contextlib.redirect_stdout(io.StringIO()):
+            derived = DerivedSignals(derived_definitions) if derived_definitions else None
+            loaded = loadPlotData(filename, use_cache, window=window, derived=derived, engine=engine)
+        if loaded is None:
+            return filename, outputs, time.perf_counter() - start_time, "could not be loaded"
+
+        # A plain Figure is not managed by pyplot, so no GUI backend is involved.
+        fig = Figure(figsize=FIGURE_SIZE)
+        buildFigure(fig, filename, *loaded, line_data={})
+
+        os.makedirs(output_dir, exist_ok=True)
+        name = os.path.splitext(os.path.basename(filename))[0]
+        if window is not None:
+            name = f"{name}_{window[0]:.15g}-{window[1]:.15g}"
+        for file_format in formats:
+            output = os.path.join(output_dir, f"{name}.{file_format}")
+            fig.savefig(output, format=file_format)
+            outputs.append(output)
+    except Exception as e:
+        return filename, outputs, time.perf_counter() - start_time, str(e)
+
+    return filename, outputs, time.perf_counter() - start_time, None
+
+
+def expandFileArguments(patterns):
+    """
+    Expands file names and glob patterns (including '**') into a list of files, keeping the given order and dropping duplicates.
+
+    Args:
+        patterns: List of file names or glob patterns.
+
+    Returns:
+        List of file names.
+    """
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        if not matches:
+            print(f"No files match {pattern}", file=sys.stderr)
+        for match in matches:
+            if match not in files:
+                files.append(match)
+    return files
+
+
+def exportPlots(filenames, output_dir, formats, workers=None, use_cache=True, window=None, derived_definitions=None, engine='auto'):
+    """
+    Batch exports many CSV files across a pool of worker processes, reporting the time taken for each file.
+
+    Args:
+        filenames:              List of CSV file names.
+        output_dir:             Directory to write the images to.
+        formats:                List of file formats to save, e.g. ['png', 'svg', 'pdf'].
+        workers:                Number of worker processes. Defaults to the number of CPU cores.
+        use_cache:              Whether to use the binary column cache.
+        window:                 Optional (t0, t1) range of ticks to render from every file.
+        derived_definitions:    Optional list of (column name, expression) tuples of derived signals to add to every file.
+        engine:                 One of LOAD_ENGINES, the parser used for files that are not cached.
+
+    Returns:
+        Number of files that failed to export.
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, len(filenames)))
+    if engine == 'auto' and workers > 1:
+        engine = 'pandas' # The worker processes already use every core, splitting each parse as well would only contend for them.
+    print(f"\nExporting {len(filenames)} file(s) to {output_dir} as {', '.join(formats)} using {workers} worker(s).\n")
+
+    start_time = time.perf_counter()
+    failures = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(exportPlot, filename, output_dir, formats, use_cache, window, derived_definitions, engine) for filename in filenames]
+        for future in concurrent.futures.as_completed(futures):
+            filename, outputs, elapsed, error = future.result()
+            if error:
+                failures += 1
+                print(f"FAILED {filename} ({elapsed:.2f}s) - {error}", file=sys.stderr)
+            else:
+                print(f"{filename} -> {', '.join(outputs)} ({elapsed:.2f}s)")
+
+    total_time = time.perf_counter() - start_time
+    print(f"\nExported {len(filenames) - failures}/{len(filenames)} file(s) in {total_time:.2f}s ({len(filenames) / max(total_time, 1e-9):.2f} files/s).")
+    return failures
+
+
+#----------------------------------------------- OVERLAY -----------------------------------------------
+
+
+def shadeColour(colour, amount):
+    """
+    Darkens or lightens a colour.
+
+    Args:
+        colour: Any matplotlib colour.
+        amount: Fraction to blend towards black if positive, or towards white if negative.
+
+    Returns:
+        The shaded colour as an RGB tuple.
+    """
+    target = 0.0 if amount > 0 else 1.0
+    return tuple(channel + (target - channel) * abs(amount) for channel in to_rgb(colour))
+
+
+def getRunLabels(filenames):
+    """
+    Names each overlaid file by its file name without the extension, numbering any that clash.
+
+    Args:
+        filenames: List of CSV file names.
+
+    Returns:
+        List of labels, one per file.
+    """
+    names = [os.path.splitext(os.path.basename(filename))[0] for filename in filenames]
+    return [f"{name} #{x + 1}" if names.count(name) > 1 else name for x, name in enumerate(names)]
+
+
+def alignToTicks(x_base, x_run, y_run):
+    """
+    Linearly interpolates a column of one run onto the ticks of the baseline run.
+
+    Args:
+        x_base: Array of the baseline ticks.
+        x_run:  Array of the ticks of the run.
+        y_run:  Array of the column values of the run.
+
+    Returns:
+        Array of the column values at the baseline ticks. NaN outside the ticks of the run.
+    """
+    if not isSorted(x_run):
+        order = np.argsort(x_run, kind='stable')
+        x_run, y_run = x_run[order], y_run[order]
+    return np.interp(x_base, x_run, y_run, left=np.nan, right=np.nan)
+
+
+def loadOverlayData(filenames, use_cache=True, show_diff=False, engine='auto'):
+    """
+    Loads several CSV files in parallel threads and merges them into one DataFrame on the ticks of the first (baseline) file,
+    so the runs can be plotted over each other. The shared tick column is stored once and every other run is interpolated onto it.
+
+    Args:
+        filenames:  List of CSV file names. The first is the baseline.
+        use_cache:  Whether to use the binary column cache.
+        show_diff:  Whether to add a difference from the baseline column for every column of the other runs.
+        engine:     One of LOAD_ENGINES, the parser used for files that are not cached.
+
+    Returns:
+        Tuple of the merged DataFrame, column names, column indices, the ignore, primary, secondary, tertiary and quaternary
+        column indices and the colour of each column. None if the baseline could not be loaded.
+    """
+    loadModule(pd)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(filenames)) as executor:
+        runs = list(executor.map(lambda filename: loadPlotData(filename, use_cache, engine=engine), filenames))
+    if runs[0] is None:
+        return None
+    labels = getRunLabels(filenames)
+
+    # The merged columns use the axis suffixes of the originals, so identifyAxes sorts them onto the same axes.
+    base_df, base_columns = runs[0][0], runs[0][1]
+    x_base = base_df[base_columns[1]].to_numpy(dtype=float)
+    merged = {column: base_df[column].to_numpy() for column in base_columns[:2] if column in base_df.columns}
+    colours = {}
+    base_values = {}
+    column_colours = getColumnColours()
+
+    for run, (loaded, label) in enumerate(zip(runs, labels)):
+        if loaded is None:
+            print(f"Skipping {filenames[run]} in the overlay", file=sys.stderr)
+            continue
+        df, columns, _, ignore_cols = loaded[:4]
+        x_run = df[columns[1]].to_numpy(dtype=float)
+        for x, column_name in enumerate(columns):
+            if x < 2 or x in ignore_cols or column_name not in df.columns or not pd.api.types.is_numeric_dtype(df[column_name]):
+                continue
+            name, sep, suffix = column_name.rpartition(':')
+            name, suffix = (name, sep + suffix) if sep and suffix.isdigit() else (column_name, '')
+            colour = column_colours.get(x, 'black')
+
+            y_run = df[column_name].to_numpy(dtype=float)
+            values = y_run if run == 0 else alignToTicks(x_base, x_run, y_run)
+            merged[f"{name} [{label}]{suffix}"] = values
+            colours[f"{name} [{label}]{suffix}"] = shadeColour(colour, OVERLAY_SHADE * run / max(len(runs) - 1, 1))
+            if run == 0:
+                base_values[column_name] = values
+            elif show_diff and column_name in base_values:
+                merged[f"{name} \u0394[{label}]{suffix}"] = values - base_values[column_name]
+                colours[f"{name} \u0394[{label}]{suffix}"] = shadeColour(colour, DIFF_SHADE)
+        runs[run] = None # Drop each run once it is merged.
+
+    df = pd.DataFrame(merged, copy=False)
+    columns = list(df.columns)
+    num_columns = list(range(len(columns)))
+    ignore_cols, primary_cols, secondary_cols, tertiary_cols, quaternary_cols = identifyAxes(columns)
+    column_colours = {x: colours[column] for x, column in enumerate(columns) if column in colours}
+    return df, columns, num_columns, ignore_cols, primary_cols, secondary_cols, tertiary_cols, quaternary_cols, column_colours
+
+
+#----------------------------------------------- PROFILING -----------------------------------------------
+
+
+class StageProfiler:
+    """
+    Records the wall time and peak memory of each stage of opening a plot. Memory is measured with tracemalloc, which covers Python and NumPy allocations.
+    """
+
+    def __init__(self):
+        self.stages = [] # (name, seconds, peak bytes allocated above the start of the stage).
+        self.current = None
+        self.started_tracing = not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start()
+
+
+    def begin(self, name):
+        """
+        Starts timing a stage. Stages do not nest, so any stage still running is ended first.
+
+        Args:
+            name: Name of the stage.
+        """
+        if self.current is not None:
+            self.end()
+        tracemalloc.reset_peak()
+        self.current = (name, time.perf_counter(), tracemalloc.get_traced_memory()[0])
+
+
+    def end(self):
+        """
+        Ends the running stage, if there is one.
+        """
+        if self.current is None:
+            return
+        name, start, start_memory = self.current
+        self.current = None
+        peak = tracemalloc.get_traced_memory()[1]
+        self.stages.append((name, time.perf_counter() - start, max(peak - start_memory, 0)))
+
+
+    def stop(self):
+        """
+        Ends the running stage and stops tracing memory, which slows down every allocation while it is on.
+        """
+        self.end()
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        Context manager that times the code inside it as one stage.
+
+        Args:
+            name: Name of the stage.
+        """
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end()
+
+
+    def report(self):
+        """
+        Prints the time and peak memory of every stage.
+        """
+        print(f"\n{'Stage':<28}{'Time ms':>12}{'Peak MB':>12}")
+        for name, elapsed, peak in self.stages:
+            print(f"{name:<28}{elapsed * 1000:>12.1f}{peak / 1024 ** 2:>12.1f}")
+        print(f"{'Total':<28}{sum(elapsed for _, elapsed, _ in self.stages) * 1000:>12.1f}")
+
+
+    def toDict(self):
+        """
+        Returns:
+            List of dictionaries of the name, seconds and peak bytes of every stage, for saving as JSON.
+        """
+        return [{'stage': name, 'seconds': elapsed, 'peak_bytes': peak} for name, elapsed, peak in self.stages]
+
+
+def profileStage(profiler, name):
+    """
+    Returns a context manager timing a stage with profiler, or one that does nothing if profiler is None.
+    """
+    return profiler.stage(name) if profiler else contextlib.nullcontext()
 
-            if len(x_data) > 0:
-                # Find closest point based on x-coordinate.
-                closest_index = min(range(len(x_data)), key=lambda i: abs(x_data[i] - x))
 
-                # Get data point coordinates.
-                point_y = y_data[closest_index]
+class ActionTimer:
+    """
+    Records how long each UI action takes, both in its handler and until the redraw it requested has finished.
+    """
 
-                label = selected_line.get_label().strip().replace('|', '').replace('\n', ' ')
+    def __init__(self):
+        self.durations = {}
+        self.pending = None
 
-                unit = ""
-                # Use integer formatting only for true ints, else float formatting
-                if isinstance(point_y, int) or (isinstance(point_y, float) and point_y.is_integer()):
-                    value_str = f"{int(point_y):d}"
-                else:
-                    value_str = f"{point_y:.2f}"
 
-                if "Position" in label: unit = ""
-                elif "Speed" in label: unit = ""
-                elif "output" in label: unit = " % Duty Cycle"
-                elif "current" in label: unit = " mA"
+    def record(self, name, elapsed):
+        """
+        Adds one timing of an action.
 
-                return f"Line: {label}\nValue: {value_str}{unit}"
+        Args:
+            name:       Name of the action.
+            elapsed:    Time taken in seconds.
+        """
+        self.durations.setdefault(name, []).append(elapsed)
 
-        except Exception as e:
-            print(f"Formatter error: {e}", file=sys.stderr)
 
-    # Return default string.
-    return "Click a line to view live data"
+    def wrap(self, name, handler, redraws=True):
+        """
+        Wraps an event handler so every call to it is timed.
 
+        Args:
+            name:       Name of the action, used in the report.
+            handler:    The event handler.
+            redraws:    Whether the handler requests a full redraw, which is then timed up to the next draw event.
 
-def createPlot(filename):
-    """
-    Opens filename as a dataframe and plots it. The order of code in this function is very important.
+        Returns:
+            The timed handler.
+        """
+        def timedHandler(*args, **kwargs):
+            start = time.perf_counter()
+            if redraws:
+                self.pending = (name, start) # Set first, as some backends draw within the handler.
+            result = handler(*args, **kwargs)
+            self.record(name, time.perf_counter() - start)
+            return result
+        return timedHandler
 
-    Args:
-        filename: The name of the file.
-    """
-    try:
-        df = pd.read_csv(filename)
-    except FileNotFoundError:
-        print(f"\nPlotting file not found: {filename}\n", file=sys.stderr)
-        return
-    except Exception as e:
-        print(f"\nError plotting {filename}: {e}\n", file=sys.stderr)
-        return
 
-    print(f"\nPlotting file: {filename}\n")
+    def onDraw(self, event):
+        """
+        Draw event handler. Completes the timing of the last action that requested a redraw.
+        """
+        if self.pending is not None:
+            name, start = self.pending
+            self.pending = None
+            self.record(f"{name} + redraw", time.perf_counter() - start)
 
-    # Gather column names with data to plot.
-    columns = df.columns.values.tolist()
-    num_columns = list(range(len(columns)))
-    print(f"Index/Column Name Below:")
-    for x in num_columns:
-        print(f"{x}) {columns[x].strip()}")
 
-    # Work out what axes each column should be on.
-    ignore_cols, primary_cols, secondary_cols, tertiary_cols, quaternary_cols = identifyAxes(columns)
+    def summarise(self):
+        """
+        Returns:
+            Dictionary mapping each action to the count, mean, p50, p99 and max of its times in milliseconds.
+        """
+        summary = {}
+        for name, durations in sorted(self.durations.items()):
+            durations = np.asarray(durations) * 1000
+            summary[name] = {
+                'count': len(durations), 'mean_ms': float(durations.mean()), 'p50_ms': float(np.percentile(durations, 50)),
+                'p99_ms': float(np.percentile(durations, 99)), 'max_ms': float(durations.max())
+            }
+        return summary
 
-    # Adjust the figure and margins.
-    fig = plt.figure(figsize=(17, 9.5))
-    fig.subplots_adjust(top=0.95, left=0.1)
-    ax1, ax2, ax3, ax4 = setupAxes(fig, filename)
-
-    # Colour palette for each plot line. If you want to customise another column, you must add in its ID and colour, otherwise it will be set to the default colour.
-    column_colours = {
-        2: sns.color_palette('tab20')[2],    # Orange - Current Position
-        3: sns.color_palette('tab20')[4],    # Green - Target Position
-        4: sns.color_palette('tab20')[2],    # Orange - Current Speed
-        5: sns.color_palette('tab20')[4],    # Green - Target Speed
-        6: sns.color_palette('tab20')[6],    # Red - Error
-        7: sns.color_palette('tab20')[18],   # Light Blue - Integral
-        9: sns.color_palette('tab20')[6],    # Red - Speed Error
-        10: sns.color_palette('tab20')[18],  # Light Blue - Integral Speed
-        12: sns.color_palette('tab20b')[2],  # Purple - P Term
-        13: sns.color_palette('tab20b')[6],  # Green - I Term
-        14: sns.color_palette('tab20b')[10], # Gold - D Term
-        15: sns.color_palette('tab20b')[18], # Pink - F Term
-        16: sns.color_palette('tab20c')[1],  # Blue - P Speed Term
-        17: sns.color_palette('tab20c')[5],  # Orange - I Speed Term
-        18: sns.color_palette('tab20c')[9],  # Green - D Speed Term
-        19: sns.color_palette('Set1')[6],    # Brown - Output
-        20: sns.color_palette('Dark2')[3],   # Purple - Current
-    }
 
-    # Calculate the max values and set the limits of the Y axes, this align zero with all axes.
-    max_abs_values = calculateMaxAbsValues(df, columns, num_columns, ignore_cols, primary_cols, secondary_cols, tertiary_cols, quaternary_cols)
+    def report(self):
+        """
+        Prints the number of calls and the mean, median, 99th percentile and worst time of each action.
+        """
+        if not self.durations:
+            return
+        print(f"\n{'Action':<28}{'Count':>8}{'Mean ms':>12}{'p50 ms':>12}{'p99 ms':>12}{'Max ms':>12}")
+        for name, stats in self.summarise().items():
+            print(f"{name:<28}{stats['count']:>8}{stats['mean_ms']:>12.2f}{stats['p50_ms']:>12.2f}{stats['p99_ms']:>12.2f}{stats['max_ms']:>12.2f}")
 
-    # Set the limits for Y axis for all axes, this aligns all columns to the zero point.
-    min_range = 0.1
-    ax1.set_ylim(-max(max_abs_values[0] * MARGIN_FACTOR, min_range), max(max_abs_values[0] * MARGIN_FACTOR, min_range))
-    ax2.set_ylim(-max(max_abs_values[1] * MARGIN_FACTOR, min_range), max(max_abs_values[1] * MARGIN_FACTOR, min_range))
-    ax3.set_ylim(-max(max_abs_values[2] * MARGIN_FACTOR, min_range), max(max_abs_values[2] * MARGIN_FACTOR, min_range))
-    ax4.set_ylim(-max(max_abs_values[3] * MARGIN_FACTOR, min_range), max(max_abs_values[3] * MARGIN_FACTOR, min_range))
 
-    # Get the plot lines for each axis.
-    primary_lines, secondary_lines, tertiary_lines, quaternary_lines = plotDataOnAxis(ax1, ax2, ax3, ax4, df, columns, num_columns, column_colours,
-        ignore_cols, primary_cols, secondary_cols, tertiary_cols, quaternary_cols
-    )
+def writeProfile(filename, csv_filename, profiler, action_timer):
+    """
+    Writes the stage profile and UI action latencies of a plot to a JSON file.
 
-    # Spaces out the individual axes plot lines.
-    spacer1_line = Line2D([0], [0], color='white', lw=0, label=' ')
-    spacer2_line = Line2D([0], [0], color='white', lw=0, label=' ')
-    spacer3_line = Line2D([0], [0], color='white', lw=0, label=' ')
+    Args:
+        filename:       The name of the JSON file.
+        csv_filename:   The name of the CSV file that was plotted.
+        profiler:       The StageProfiler of the plot.
+        action_timer:   The ActionTimer of the plot.
+    """
+    profile = {'file': csv_filename, 'stages': profiler.toDict(), 'actions': action_timer.summarise()}
+    try:
+        with open(filename, 'w') as f:
+            json.dump(profile, f, indent=2)
+        print(f"\nProfile written to {filename}")
+    except OSError as e:
+        print(f"Error writing profile to {filename} - {e}", file=sys.stderr)
 
-    # Combine all lines and labels.
-    all_lines = primary_lines + [spacer1_line] + secondary_lines + [spacer2_line] + tertiary_lines + [spacer3_line] + quaternary_lines
-    all_labels = [line.get_label() for line in all_lines]
 
-    # Define all_axes to include the axes for each line.
-    all_axes = ([ax1] * len(primary_lines) + [None] + [ax2] * len(secondary_lines) + [None] + [ax3] * len(tertiary_lines) + [None] + [ax4] * len(quaternary_lines))
+def createPlot(filename, use_cache=True, use_blit=True, follow_interval=None, show=True, startup_time=None, rescale_visible=False, ui_stats=False, overlay_files=None, show_diff=False, stream=False, window=None, profile=False, profile_output=None, derived=None, engine='auto', low_memory=False, restore_session=True, async_load=False):
+    """
+    Opens filename as a dataframe and plots it. The order of code in this function is very important.
 
-    # Create the legend - Call helper directly.
-    legend_properties = getLegendProperties()
-    legend = fig.legend(all_lines, all_labels, fancybox=True, shadow=True, bbox_to_anchor=(0.20, 0.52), **legend_properties)
+    Args:
+        filename:           The name of the file.
+        use_cache:          Whether to use the binary column cache for faster re-opening.
+        use_blit:           Whether to redraw the value box, selection highlight and legend by blitting them over a cached background.
+        follow_interval:    If given, the file is polled every follow_interval milliseconds and rows appended to it are added to the plot.
+        show:               Whether to block in plt.show(). The plotter server shows the figure itself.
+        startup_time:       Optional time.perf_counter() value. If given, the time from it until the window is first drawn is printed.
+        rescale_visible:    Whether to fit the Y limits to the visible lines within the visible x-range whenever either changes.
+        ui_stats:           Whether to time every UI action and print a summary when the window is closed.
+        overlay_files:      Optional list of further files to plot over filename, which is the baseline they are aligned to.
+        show_diff:          Whether to also plot the difference of each overlaid column from the baseline.
+        stream:             Whether to read the file a chunk at a time into a min/max summary, for files larger than memory.
+                            The overview is drawn after the first chunk and fills in as the rest is read.
+        window:             Optional (t0, t1) range of ticks to plot. Only those rows are read from the file.
+        profile:            Whether to print the time and peak memory of each stage once the window is drawn, and the latency of
+                            every UI action when it is closed.
+        profile_output:     Optional JSON file to also write the profile to when the window is closed.
+        derived:            Optional DerivedSignals to plot alongside the columns of the file. Hidden ones may be evicted from memory
+                            and are recalculated when shown again.
+        engine:             One of LOAD_ENGINES, the parser used when the file is not cached.
+        low_memory:         Whether to keep compact float32 or int16 copies of the columns and release the DataFrame once the lines
+                            are drawn. The peak memory of the process is printed once the window is drawn.
+        restore_session:    Whether to restore the view saved when the file was last closed. Plain views of a whole cached file
+                            are saved on closing either way.
+        async_load:         Whether to show the window straight away and parse the file in a background thread, drawing
+                            the rows as they arrive. A cached file is loaded as normal, as that takes no time.
+    """
+    profiler = StageProfiler() if profile or profile_output else None
+    if profiler: profiler.begin('import pyplot')
+    import matplotlib.pyplot as plt # Deferred so the batch export and the server hand-off never load a GUI backend.
+
+    follow_offset = None
+    if profiler: profiler.begin('load')
+    if follow_interval:
+        # Only read up to the last complete line, the rest is picked up by the live tail. A growing file would never hit the cache.
+        try:
+            follow_offset, num_lines = findCompleteLines(filename)
+        except OSError as e:
+            print(f"\nError plotting {filename}: {e}\n", file=sys.stderr)
+            return
+        loaded = loadPlotData(filename, use_cache=False, nrows=max(num_lines - 1, 0))
+    elif overlay_files:
+        loaded = loadOverlayData([filename] + overlay_files, use_cache, show_diff, engine)
+    elif stream or async_load:
+        loaded = loadPlotData(filename, use_cache=False, nrows=0) # Only the header, the rows are streamed or loaded below.
+    else:
+        loaded = loadPlotData(filename, use_cache, window=window, derived=derived, engine=engine)
+    if loaded is None:
+        return
+
+    csv_stream = None
+    if stream:
+        try:
+            csv_stream = CsvStream(filename, loaded[1], loaded[3])
+            csv_stream.readNext()
+        except Exception as e:
+            print(f"\nError plotting {filename}: {e}\n", file=sys.stderr)
+            return
+        loaded = (csv_stream.frame(),) + loaded[1:]
+
+    loader = None
+    if async_load:
+        cached = readCache(filename, list(loaded[0].columns)) if use_cache else None
+        if cached is not None:
+            print(f"\nLoaded {filename} from cache.")
+            loaded = (cached,) + loaded[1:]
+        else:
+            loader = BackgroundLoader(filename, loaded[1], loaded[3])
+    if profiler: profiler.end()
+    df, columns, num_columns, ignore_cols, primary_cols, secondary_cols, tertiary_cols, quaternary_cols = loaded[:8]
+    column_colours = loaded[8] if overlay_files else None
+    title = ' vs '.join(os.path.basename(name) for name in [filename] + overlay_files) if overlay_files else filename
+
+    # The view of a whole file is saved when its window closes. Reopening it restores the view, and the saved column stats,
+    # overview and pyramids mean the first render does not need to scan the rows.
+    use_session = use_cache and not (follow_interval or overlay_files or stream or window is not None or derived or loader)
+    session = readSession(filename, columns) if use_session and restore_session else None
+    column_stats = {}
+    overview = None
+    x_sorted = None
+    if session:
+        session_state, session_arrays = session
+        column_stats.update(session_state['column_stats'])
+        overview = {columns[int(x)]: (session_arrays[f"overview_{x}_x"], session_arrays[f"overview_{x}_y"]) for x in session_state['overview']}
+        x_sorted = session_state.get('x_sorted')
+
+    # Adjust the figure and margins, then plot the lines downsampled to the resolution of the screen.
+    with profileStage(profiler, 'figure'):
+        fig = plt.figure(figsize=FIGURE_SIZE)
+    line_data = {}
+    line_columns = {}
+    axes, line_groups, all_lines, all_axes, legend, max_abs_values = buildFigure(fig, title, df, columns, num_columns,
+        ignore_cols, primary_cols, secondary_cols, tertiary_cols, quaternary_cols, line_data, line_columns, column_stats, column_colours, profiler, overview, x_sorted
+    )
+    if profiler: profiler.begin('handlers')
+    ax1, ax2, ax3, ax4 = axes
+    primary_lines, secondary_lines, tertiary_lines, quaternary_lines = line_groups
     legend.set_draggable(True)
+    # The lines are first drawn decimated for the whole file, which is kept as the overview to save with the session.
+    whole_view = {line: line.get_data() for line in line_data} if use_session else None
+    if low_memory:
+        compactLineData(line_data)
+
+    # The derived signals are held by their cache rather than the dataframe, so evicting a hidden one frees its memory.
+    derived_lines = {line: column_name for line, column_name in line_columns.items() if derived is not None and column_name in derived.names}
+    if derived_lines:
+        df = df.drop(columns=list(derived_lines.values()))
+        derived_x_full, _, derived_x_index = line_data[next(iter(derived_lines))]
+    if low_memory:
+        # Only the columns needed to recalculate evicted derived signals are kept.
+        df = df[[columns[1]] + sorted(derived.references() & set(df.columns))] if derived_lines else None
+        loaded = None
+
+    action_timer = ActionTimer() if ui_stats or profiler else None
+
+    def timed(name, handler, redraws=True):
+        """
+        Returns handler timed under name when --ui-stats or --profile is on, otherwise handler unchanged.
+        """
+        return action_timer.wrap(name, handler, redraws) if action_timer else handler
+
+    if startup_time is not None or profiler or low_memory:
+        def onFirstDraw(event):
+            """
+            Reports the time to first window, the stage profile and the memory use once, for --profile-startup, --profile and --low-memory.
+            """
+            fig.canvas.mpl_disconnect(first_draw_id)
+            if profiler:
+                profiler.stop()
+                profiler.report()
+            if startup_time is not None:
+                print(f"\nFirst window drawn {time.perf_counter() - startup_time:.2f}s after start up.")
+            if low_memory:
+                peak_rss = getPeakRss()
+                peak_text = f"{peak_rss / 1024 ** 2:.1f} MB" if peak_rss is not None else "unavailable on this platform"
+                print(f"\n{title}: line data {getLineDataBytes(line_data) / 1024 ** 2:.1f} MB, peak RSS {peak_text}.")
+
+        first_draw_id = fig.canvas.mpl_connect('draw_event', onFirstDraw)
+
+    # Display coordinates of each line for click selection, built on demand and dropped whenever the view changes.
+    pick_index = {}
+
+    # Min/max pyramid of each line for rescaling to a zoomed x-range, built on demand and dropped whenever the data grows.
+    pyramids = {}
+    if session:
+        for line, column_name in line_columns.items():
+            x = str(columns.index(column_name))
+            if x in session_state['pyramids']:
+                pyramids[line] = [(block_size, session_arrays[f"pyramid_{x}_{level}_min"], session_arrays[f"pyramid_{x}_{level}_max"])
+                                  for level, block_size in enumerate(session_state['pyramids'][x])]
+
+    # The view the saved overview was decimated for. Until the view changes from it, the lines need no re-decimating.
+    overview_view = (tuple(ax1.get_xlim()), ax1.bbox.width) if overview else None
+
+    def rescaleVisible():
+        """
+        Fits the zero-aligned Y limits to the visible lines. The cached column stats are used when the whole x-range is in view,
+        otherwise the range of the visible slice of each line is found from its min/max pyramid.
+        """
+        x_min, x_max = ax1.get_xlim()
+        axis_max_abs = {}
+        for line, column_name in line_columns.items():
+            if not line.get_visible() or line not in line_data:
+                continue
+            x_full, y_full, x_index = line_data[line]
+            if len(x_full) == 0:
+                continue
+
+            # Unsorted x has no contiguous visible slice, so it uses the stats of the whole column.
+            if x_index is not None or (x_min <= x_full[0] and x_max >= x_full[-1]):
+                line_max_abs = column_stats[column_name]['abs_max']
+            else:
+                start = np.searchsorted(x_full, x_min, side='left')
+                stop = np.searchsorted(x_full, x_max, side='right')
+                if start >= stop:
+                    continue
+                if line not in pyramids:
+                    pyramids[line] = buildMinMaxPyramid(y_full)
+                y_min, y_max = rangeMinMax(y_full, pyramids[line], start, stop)
+                line_max_abs = max(abs(y_min), abs(y_max))
+            if np.isfinite(line_max_abs):
+                axis_max_abs[line.axes] = max(axis_max_abs.get(line.axes, 0), line_max_abs)
+
+        # Axes with nothing visible keep their current limits.
+        setZeroAlignedLimits(ax1, ax2, ax3, ax4, [axis_max_abs.get(ax, ax.get_ylim()[1] / MARGIN_FACTOR) for ax in (ax1, ax2, ax3, ax4)])
+
+    # Re-decimate the lines whenever the visible x-range or the window size changes. The twin axes share x, so ax1 sees every change.
+    def onViewChanged(*args):
+        """
+        Recomputes the downsampled lines and invalidates the pick index after a change of limits or window size.
+        """
+        nonlocal overview_view
+        if csv_stream is not None:
+            selectStreamData()
+        if overview_view != (tuple(ax1.get_xlim()), ax1.bbox.width):
+            overview_view = None
+            updateDownsampledLines(line_data, ax1.get_xlim())
+        pick_index.clear()
+        if rescale_visible:
+            rescaleVisible()
+        updateHighlight()
+
+    ax1.callbacks.connect('xlim_changed', timed('view change', onViewChanged))
+    fig.canvas.mpl_connect('resize_event', timed('resize', onViewChanged))
+    for ax in (ax1, ax2, ax3, ax4):
+        ax.callbacks.connect('ylim_changed', lambda ax: pick_index.clear())
+
+    # Make legend interactive. The registry maps each line to its legend entry, axis and group.
+    line_registry, lined = buildLineRegistry(legend, all_lines, all_axes, {
+        'primary': primary_lines, 'secondary': secondary_lines, 'tertiary': tertiary_lines, 'quaternary': quaternary_lines
+    })
+    for legend_artist in lined:
+        legend_artist.set_picker(True)
+
+
+    def setLinesVisible(lines, visible):
+        """
+        Shows or hides lines and fades their legend entries, without redrawing.
 
-    # Make legend interactive.
-    lined = {}
-    for legline, legtext, origline in zip(legend.get_lines(), legend.get_texts(), all_lines):
-        # Check if origline is valid before setting picker.
-        if isinstance(origline, Line2D):
-            legline.set_picker(True)
-            legtext.set_picker(True)
-            lined[legline] = origline
-            lined[legtext] = origline
+        Args:
+            lines:      The lines to update.
+            visible:    Whether the lines should be visible.
+        """
+        alpha = 1.0 if visible else 0.2
+        for line in lines:
+            entry = line_registry.get(line)
+            if entry is None:
+                continue
+            line.set_visible(visible)
+            entry['legline'].set_alpha(alpha)
+            entry['legtext'].set_alpha(alpha)
+            if line in derived_lines:
+                updateDerivedLine(line, visible)
+
+
+    def updateDerivedLine(line, visible):
+        """
+        Recalculates a derived line that was evicted while hidden when it is shown, and drops the data of any evicted on hiding.
+
+        Args:
+            line:       The derived line.
+            visible:    Whether it is now visible.
+        """
+        column_name = derived_lines[line]
+        if visible and line not in line_data:
+            y_full = derived.evaluate(column_name, df, columns[1])
+            if low_memory:
+                y_full = compactColumn(y_full)
+            line_data[line] = (derived_x_full, y_full, derived_x_index)
+            line.set_data(*decimateMinMax(derived_x_full, y_full, *ax1.get_xlim(), line.axes.bbox.width, derived_x_index is None))
+            pick_index.pop(line, None)
+        for evicted in derived.setHidden(column_name, not visible):
+            evicted_line = next(evicted_line for evicted_line, name in derived_lines.items() if name == evicted)
+            line_data.pop(evicted_line, None)
+            pyramids.pop(evicted_line, None)
+
+
+    def finishVisibilityChange():
+        """
+        Refits the axes if enabled, updates the highlight and requests the one redraw after a batch of visibility changes.
+        """
+        if rescale_visible:
+            rescaleVisible()
+        updateHighlight()
+        fig.canvas.draw_idle() # The lines themselves changed, so the background has to be redrawn.
 
 
     #----------------------------------------------- ON PICK -----------------------------------------------
@@ -375,16 +3148,11 @@ def createPlot(filename):
             return
         else:
             origline = lined[clicked_object]
-            visible = not origline.get_visible()
-            origline.set_visible(visible)
-            for legline, legtext in zip(legend.get_lines(), legend.get_texts()):
-                if lined[legline] == origline:
-                    legline.set_alpha(1.0 if visible else 0.2)
-                    legtext.set_alpha(1.0 if visible else 0.2)
-            fig.canvas.draw()
+            setLinesVisible([origline], not origline.get_visible())
+            finishVisibilityChange()
 
     # Connect the onPick event.
-    fig.canvas.mpl_connect('pick_event', onPick)
+    fig.canvas.mpl_connect('pick_event', timed('legend pick', onPick))
 
 
     #----------------------------------------------- LINE VALUE BOX -----------------------------------------------
@@ -396,10 +3164,121 @@ def createPlot(filename):
                         bbox=dict(facecolor='white', alpha=0.9, edgecolor='red', boxstyle='round,pad=0.5'),
                         fontsize=12)
 
+    # Stats of the selected line within the zoomed window, shown while a line is selected.
+    stats_display = fig.text(0.895, 0.935, "", ha='right', va='top', visible=False,
+                        bbox=dict(facecolor='white', alpha=0.9, edgecolor='#666666', boxstyle='round,pad=0.5'),
+                        fontsize=9, family='monospace')
+    range_stats = {} # RangeStats of the selected line only, built when it is selected and dropped when the selection changes.
+
     hide_flags = {'all': False, 'primary': False, 'secondary': False, 'tertiary': False, 'quaternary': False}
     button_refs = {}
 
 
+    #----------------------------------------------- BLITTING -----------------------------------------------
+
+
+    # The selected line is highlighted by a thicker copy drawn over it, so changing the selection leaves the plotted lines untouched.
+    highlight_line = Line2D([], [], visible=False)
+    fig.add_artist(highlight_line)
+
+    # Artists that change on selection and on hover. When blitting they are left out of normal draws and painted over cached backgrounds.
+    # The selection layer is cached too, so hovering only repaints the value box.
+    use_blit = use_blit and fig.canvas.supports_blit
+    selection_artists = [highlight_line, legend, stats_display]
+    for artist in selection_artists + [text_display]:
+        artist.set_animated(use_blit)
+    background = None
+    selection_background = None
+
+
+    def updateHighlight():
+        """
+        Copies the style and current (downsampled) data of the selected line onto the highlight line, and updates the stats panel.
+        """
+        if selected_line and selected_line.get_visible():
+            highlight_line.update_from(selected_line)
+            highlight_line.set_data(*selected_line.get_data())
+            highlight_line.set_linewidth(3.0)
+            highlight_line.set_visible(True)
+        else:
+            highlight_line.set_visible(False)
+        updateStatsPanel()
+
+
+    def updateStatsPanel():
+        """
+        Shows the stats of the full resolution data of the selected line within the visible x-range. The streaming overview
+        only holds the minimum and maximum of each bin, so it has no panel.
+        """
+        if selected_line not in range_stats:
+            range_stats.clear() # Each line's stats cost several times its data, so only the selected line keeps them.
+        if not selected_line or not selected_line.get_visible() or selected_line not in line_data or csv_stream is not None:
+            stats_display.set_visible(False)
+            return
+        x_full, y_full, x_index = line_data[selected_line]
+        if selected_line not in range_stats or range_stats[selected_line].values is not y_full:
+            range_stats[selected_line] = RangeStats(y_full) # Rebuilt whenever the data of the line is replaced.
+
+        # Unsorted x has no contiguous visible slice, so it uses the whole line.
+        if x_index is None:
+            x_min, x_max = ax1.get_xlim()
+            start, stop = np.searchsorted(x_full, x_min, side='left'), np.searchsorted(x_full, x_max, side='right')
+        else:
+            start, stop = 0, len(x_full)
+        stats = range_stats[selected_line].summarise(x_full, int(start), int(stop))
+        stats_display.set_text(formatRangeStats(selected_line.get_label(), stats))
+        stats_display.set_visible(True)
+
+
+    def drawSelectionLayer():
+        """
+        Paints the selection artists over the background and caches the result for hover updates.
+        """
+        nonlocal selection_background
+        for artist in selection_artists:
+            fig.draw_artist(artist)
+        selection_background = fig.canvas.copy_from_bbox(fig.bbox)
+
+
+    def onDraw(event):
+        """
+        Draw event handler. Caches the freshly drawn background and paints the animated artists on top of it.
+        """
+        nonlocal background, selection_background
+        if fig.canvas.is_saving():
+            # Paint the animated artists into the saved image, the cached backgrounds would be the wrong size after saving.
+            for artist in selection_artists + [text_display]:
+                artist.draw(event.renderer)
+            background = selection_background = None
+            return
+        background = fig.canvas.copy_from_bbox(fig.bbox)
+        drawSelectionLayer()
+        fig.draw_artist(text_display)
+
+
+    def refreshAnimated(hover_only=False):
+        """
+        Redraws only the animated artists by restoring a cached background, falling back to a full redraw when blitting is off.
+
+        Args:
+            hover_only: True if only the value box changed, so the cached selection layer can be reused.
+        """
+        if not use_blit or background is None:
+            fig.canvas.draw_idle()
+            return
+        if hover_only:
+            fig.canvas.restore_region(selection_background)
+        else:
+            fig.canvas.restore_region(background)
+            drawSelectionLayer()
+        fig.draw_artist(text_display)
+        fig.canvas.blit(fig.bbox)
+
+
+    if use_blit:
+        fig.canvas.mpl_connect('draw_event', onDraw)
+
+
     def onHover(event):
         """
         Event handler for mouse movement over the plot area. Updates the text box with the value at the cursor for the selected line.
@@ -409,13 +3288,13 @@ def createPlot(filename):
             if selected_line and selected_line.get_visible():
                 x = event.xdata
                 if x is not None: # Check if xdata is valid.
-                    string = customCoordFormatter(x, selected_line)
+                    string = customCoordFormatter(x, selected_line, line_data)
                     text_display.set_text(string)
-                    fig.canvas.draw_idle()
+                    refreshAnimated(hover_only=True)
 
 
     # Connect the onHover event.
-    fig.canvas.mpl_connect('motion_notify_event', onHover)
+    fig.canvas.mpl_connect('motion_notify_event', timed('hover', onHover, redraws=False))
 
 
     #----------------------------------------------- ON CLICK -----------------------------------------------
@@ -428,6 +3307,7 @@ def createPlot(filename):
         Locates the data for the chosen line and mouse cursor location and updates the text value box.
         """
         nonlocal selected_line
+        previous_line = selected_line
         # First check if we're inside one of the plot axes.
         if event.inaxes in [ax1, ax2, ax3, ax4]:
             # Check if the click was inside the legend's bbox.
@@ -454,19 +3334,15 @@ def createPlot(filename):
                     continue
 
                 try:
-                    # Get the data from the line.
-                    x_data, y_data = line.get_data()
-
-                    if len(x_data) > 0:
-                        # Pixel distance calculation (more accurate for picking).
-                        display_coords = ax.transData.transform(list(zip(x_data, y_data)))
-                        distances = ((display_coords[:, 0] - click_display[0])**2 +
-                                     (display_coords[:, 1] - click_display[1])**2)**0.5
-                        current_min_dist = distances.min()
-
-                        if current_min_dist < min_distance:
-                            min_distance = current_min_dist
-                            closest_line = line
+                    # Pixel distance calculation (more accurate for picking), using the cached display coordinates of the line.
+                    if line not in pick_index:
+                        pick_index[line] = buildPickIndex(line, ax)
+                    display_coords, x_sorted = pick_index[line]
+                    current_min_dist = distanceToLine(display_coords, x_sorted, click_display, click_tolerance)
+
+                    if current_min_dist < min_distance:
+                        min_distance = current_min_dist
+                        closest_line = line
                 except Exception as e:
                     print(f"Error finding closest point {e}", file=sys.stderr)
                     continue
@@ -484,32 +3360,32 @@ def createPlot(filename):
             elif selected_line: # Clicked away from any line, deselect if one was selected.
                  selected_line = None
 
-            # Update visuals (line width, legend text colour).
-            for line in all_lines:
-                if isinstance(line, Line2D) and line.get_visible():
-                    line.set_linewidth(3.0 if line == selected_line else 1.5)
+            # Update visuals (highlight line, legend text colour).
+            updateHighlight()
 
-            for legtext in legend.get_texts():
-                 # Check if the text object is in our mapping before getting label.
-                 legtext.set_color('red' if legtext in lined and lined[legtext] == selected_line else 'black')
+            # Only the legend entries of the old and new selection change colour.
+            if previous_line in line_registry:
+                line_registry[previous_line]['legtext'].set_color('black')
+            if selected_line in line_registry:
+                line_registry[selected_line]['legtext'].set_color('red')
 
             # Update text box.
             if newly_selected: # Update text immediately on new selection.
-                 string = customCoordFormatter(x, newly_selected) # Use newly selected line.
+                 string = customCoordFormatter(x, newly_selected, line_data) # Use newly selected line.
                  text_display.set_text(string)
             elif selected_line is None: # Deselected or clicked away.
                  text_display.set_text("Click a line to view live data")
 
-            fig.canvas.draw_idle()  # Refresh figure.
+            refreshAnimated()  # Refresh figure.
 
     # Connect the click handler.
-    fig.canvas.mpl_connect('button_press_event', onClick)
+    fig.canvas.mpl_connect('button_press_event', timed('click', onClick, redraws=not use_blit))
 
 
     #----------------------------------------------- SHOW/HIDE BUTTONS -----------------------------------------------
 
 
-    def toggleVisibilityGroup(event, group_key, lines_list, set_visibility=None):
+    def toggleVisibilityGroup(event, group_key, lines_list, set_visibility=None, redraw=True):
         """
         Toggles visibility for a group of lines and updates legend and button label.
 
@@ -518,26 +3394,21 @@ def createPlot(filename):
             group_key:      The key for the group ('primary', 'secondary', etc.).
             lines_list:     The list of Line2D objects for the group.
             set_visibility: If not None, force visibility to this value.
+            redraw:         Whether to redraw now. False when several groups are changed in one batch.
         """
         nonlocal hide_flags
         # Determine current visibility by checking the first line (if any)
         current_visible = lines_list and lines_list[0].get_visible()
         # If set_visibility is provided, use it; otherwise, toggle
         new_visibility = set_visibility if set_visibility is not None else not current_visible
-        new_alpha = 1.0 if new_visibility else 0.2
         new_button_text = f"Hide {group_key.capitalize()}" if new_visibility else f"Show {group_key.capitalize()}"
 
-        for line in lines_list:
-            if isinstance(line, Line2D):
-                line.set_visible(new_visibility)
-                # Update legend items.
-                for legline, legtext in zip(legend.get_lines(), legend.get_texts()):
-                    if legline in lined and lined[legline] == line: legline.set_alpha(new_alpha)
-                    if legtext in lined and lined[legtext] == line: legtext.set_alpha(new_alpha)
+        setLinesVisible(lines_list, new_visibility)
 
         hide_flags[group_key] = not new_visibility  # True means hidden, False means visible
         if group_key in button_refs: button_refs[group_key].label.set_text(new_button_text)
-        fig.canvas.draw_idle()
+        if redraw:
+            finishVisibilityChange()
 
 
     def toggleShowHideAll(event):
@@ -549,13 +3420,12 @@ def createPlot(filename):
         if 'all' in button_refs:
             button_refs['all'].label.set_text('Show All' if hide_flags['all'] else 'Hide All')
 
-        # Explicitly set visibility for all groups
-        toggleVisibilityGroup(event, 'primary', primary_lines, set_visibility=not hide_flags['all'])
-        toggleVisibilityGroup(event, 'secondary', secondary_lines, set_visibility=not hide_flags['all'])
-        toggleVisibilityGroup(event, 'tertiary', tertiary_lines, set_visibility=not hide_flags['all'])
-        toggleVisibilityGroup(event, 'quaternary', quaternary_lines, set_visibility=not hide_flags['all'])
-
-        fig.canvas.draw_idle()
+        # Explicitly set visibility for all groups, then redraw once.
+        toggleVisibilityGroup(event, 'primary', primary_lines, set_visibility=not hide_flags['all'], redraw=False)
+        toggleVisibilityGroup(event, 'secondary', secondary_lines, set_visibility=not hide_flags['all'], redraw=False)
+        toggleVisibilityGroup(event, 'tertiary', tertiary_lines, set_visibility=not hide_flags['all'], redraw=False)
+        toggleVisibilityGroup(event, 'quaternary', quaternary_lines, set_visibility=not hide_flags['all'], redraw=False)
+        finishVisibilityChange()
 
 
     # Create buttons and connect handlers.
@@ -578,24 +3448,591 @@ def createPlot(filename):
         btn = Button(ax_btn, label)
         button_refs[key] = btn # Store button ref.
         if key == 'all':
-            btn.on_clicked(toggleShowHideAll)
+            btn.on_clicked(timed('toggle all', toggleShowHideAll))
+        else:
+            btn.on_clicked(timed(f"toggle {key}", lambda event, k=key, l=button_lines[key]: toggleVisibilityGroup(event, k, l)))
+
+    if action_timer:
+        fig.canvas.mpl_connect('draw_event', action_timer.onDraw)
+        fig.canvas.mpl_connect('close_event', lambda event: action_timer.report())
+    if profile_output:
+        fig.canvas.mpl_connect('close_event', lambda event: writeProfile(profile_output, filename, profiler, action_timer))
+
+
+    #----------------------------------------------- SESSION -----------------------------------------------
+
+
+    def restoreView(state):
+        """
+        Restores the hidden lines, selection, legend position and limits saved when the file was last closed.
+
+        Args:
+            state: The view state dictionary from readSession.
+        """
+        nonlocal selected_line
+        column_lines = {column_name: line for line, column_name in line_columns.items()}
+        hidden = [column_lines[column_name] for column_name in state['hidden'] if column_name in column_lines]
+        setLinesVisible(hidden, False)
+        for group_key, lines_list in button_lines.items():
+            hide_flags[group_key] = bool(lines_list) and not any(line.get_visible() for line in lines_list)
+            button_refs[group_key].label.set_text(f"{'Show' if hide_flags[group_key] else 'Hide'} {group_key.capitalize()}")
+        hide_flags['all'] = state['hide_flags'].get('all', False)
+        button_refs['all'].label.set_text('Show All' if hide_flags['all'] else 'Hide All')
+
+        legend_loc = state['legend_loc']
+        if isinstance(legend_loc, list):
+            legend.set_bbox_to_anchor(None) # The position is relative to the whole figure, as it is once the legend is dragged.
+            legend_loc = tuple(legend_loc)
+        set_loc = getattr(legend, 'set_loc', None) or legend._set_loc # Legend.set_loc is public from matplotlib 3.8.
+        set_loc(legend_loc)
+
+        if not rescale_visible:
+            for ax, ylim in zip((ax1, ax2, ax3, ax4), state['ylims']):
+                ax.set_ylim(ylim)
+        if not np.allclose(state['xlim'], ax1.get_xlim()):
+            ax1.set_xlim(state['xlim']) # Re-decimates, and refits the axes with --rescale-visible.
+        elif rescale_visible:
+            rescaleVisible()
+        selected_line = column_lines.get(state['selected'])
+        updateHighlight()
+
+
+    def saveSession(event):
+        """
+        Saves the view, column stats, the pyramids built so far and the overview every line was first drawn with, when the window
+        is closed. Nothing is recalculated from the rows, so closing takes no longer however large the file is.
+        """
+        arrays = {}
+        pyramid_levels = {}
+        overview_columns = []
+        for line, column_name in line_columns.items():
+            if line not in whole_view:
+                continue
+            x = columns.index(column_name)
+            if line in pyramids:
+                pyramid_levels[str(x)] = [block_size for block_size, _, _ in pyramids[line]]
+                for level, (_, level_min, level_max) in enumerate(pyramids[line]):
+                    arrays[f"pyramid_{x}_{level}_min"] = level_min
+                    arrays[f"pyramid_{x}_{level}_max"] = level_max
+            arrays[f"overview_{x}_x"], arrays[f"overview_{x}_y"] = whole_view[line]
+            overview_columns.append(str(x))
+        x_sorted = all(x_index is None for _, _, x_index in line_data.values())
+
+        # The legend's lower left corner as a fraction of the figure, which is how dragging it positions it.
+        legend_box = legend.get_window_extent()
+        legend_loc = ((legend_box.x0 - fig.bbox.x0) / fig.bbox.width, (legend_box.y0 - fig.bbox.y0) / fig.bbox.height)
+        state = {
+            'columns': columns, 'xlim': list(ax1.get_xlim()), 'ylims': [list(ax.get_ylim()) for ax in (ax1, ax2, ax3, ax4)],
+            'hidden': [column_name for line, column_name in line_columns.items() if not line.get_visible()], 'hide_flags': hide_flags,
+            'selected': line_columns.get(selected_line), 'legend_loc': list(legend_loc),
+            'column_stats': column_stats, 'pyramids': pyramid_levels, 'overview': overview_columns, 'x_sorted': x_sorted
+        }
+        writeSession(filename, state, arrays)
+
+
+    if use_session:
+        fig.canvas.mpl_connect('close_event', saveSession)
+    if session:
+        restoreView(session_state)
+
+
+    #----------------------------------------------- LIVE TAIL -----------------------------------------------
+
+
+    if (follow_interval or loader) and line_data:
+        tickMs = columns[1]
+        usecols = sorted(set(x for x, column in enumerate(columns) if column in df.columns))
+        max_abs_values = list(max_abs_values)
+
+        # Copy the plotted data into growable buffers, every line shares the one x buffer.
+        x_buffer = GrowableBuffer(next(iter(line_data.values()))[0])
+        y_buffers = {line: GrowableBuffer(y_data) for line, (_, y_data, _) in line_data.items()}
+        x_index = buildXIndex(x_buffer.view())
+
+
+        def onFollowTimer():
+            """
+            Timer callback. Appends the rows written since the last poll to the lines.
+            """
+            nonlocal follow_offset
+            try:
+                new_rows, follow_offset = readAppendedRows(filename, follow_offset, columns, usecols)
+            except Exception as e:
+                print(f"Error following {filename} - {e}", file=sys.stderr)
+                return
+            if new_rows is None or len(new_rows) == 0:
+                return
+            appendRows(new_rows)
+
+
+        def appendRows(new_rows):
+            """
+            Appends rows to the lines and grows the axis limits if they no longer fit.
+
+            Args:
+                new_rows: The pandas DataFrame of the new rows.
+            """
+            nonlocal x_index, max_abs_values
+            # Keep following the end of the data if it is currently in view.
+            previous_x_last = x_buffer.view()[-1] if x_buffer.size else -np.inf
+            showing_end = ax1.get_xlim()[1] >= previous_x_last
+
+            # Convert every column before appending to any buffer, so a bad row cannot leave the ticks and lines out of step.
+            # Text in a numeric column is read as NaN, as the streaming and background loaders do.
+            numeric_columns = {tickMs, *line_columns.values(), *column_stats}
+            new_rows = new_rows.assign(**{column: pd.to_numeric(new_rows[column], errors='coerce')
+                                          for column in numeric_columns if column in new_rows.columns})
+            x_new = new_rows[tickMs].to_numpy(dtype=float)
+            y_new = {line: new_rows[column_name].to_numpy(dtype=float) for line, column_name in line_columns.items()}
+
+            x_buffer.append(x_new)
+            if x_index is not None or not (isSorted(x_new) and x_new[0] >= previous_x_last):
+                x_index = buildXIndex(x_buffer.view()) # Only rebuilt for unsorted data.
+            for line in line_columns:
+                y_buffers[line].append(y_new[line])
+                line_data[line] = (x_buffer.view(), y_buffers[line].view(), x_index)
+            if selected_line in range_stats:
+                range_stats[selected_line].extend(line_data[selected_line][1]) # Rather than being rebuilt for the whole line when next shown.
+            pyramids.clear()
+
+            # Grow the zero-aligned limits by merging the stats of the new rows alone into the cached ones.
+            mergeColumnStats(column_stats, calculateColumnStats(new_rows, list(column_stats)))
+            new_max_abs_values = calculateMaxAbsValues(df, columns, num_columns, ignore_cols, primary_cols, secondary_cols, tertiary_cols, quaternary_cols, column_stats)
+            if not rescale_visible and any(new > old for new, old in zip(new_max_abs_values, max_abs_values)):
+                max_abs_values = new_max_abs_values
+                setZeroAlignedLimits(ax1, ax2, ax3, ax4, max_abs_values)
+
+            x_min, x_max = ax1.get_xlim()
+            if previous_x_last == -np.inf:
+                ax1.set_xlim(np.nanmin(x_new), np.nanmax(x_new)) # The first rows, the limits of the empty plot mean nothing.
+            elif showing_end and np.nanmax(x_new) > x_max:
+                ax1.set_xlim(x_min, np.nanmax(x_new)) # Re-decimates and rescales through onViewChanged.
+            else:
+                onViewChanged()
+            fig.canvas.draw_idle()
+
+
+    if follow_interval and line_data:
+        # The close handler keeps a reference to the timer for the life of the figure, otherwise it is garbage collected and stops.
+        follow_timer = fig.canvas.new_timer(interval=follow_interval)
+        follow_timer.add_callback(timed('follow update', onFollowTimer))
+        follow_timer.start()
+        fig.canvas.mpl_connect('close_event', lambda event: follow_timer.stop())
+
+
+    #----------------------------------------------- BACKGROUND LOADING -----------------------------------------------
+
+
+    loading = loader is not None
+
+    def onLoaderTimer():
+        """
+        Timer callback. Draws the rows the background loader has parsed since the last check, and the progress in the title.
+        """
+        nonlocal loading
+        new_rows = []
+        fraction = None
+        error = None
+        for kind, value, progress in loader.poll():
+            if kind == 'rows':
+                new_rows.append(value)
+                fraction = progress
+            else:
+                loading = False
+                error = value if kind == 'error' else None
+
+        if not loading:
+            loader_timer.stop()
+        if error is not None:
+            ax1.set_title(f"{os.path.split(title)[1]} (loading failed)")
+            print(f"\nError loading {filename} - {error}", file=sys.stderr)
+        elif not loading:
+            ax1.set_title(os.path.split(title)[1])
+        elif fraction is not None:
+            ax1.set_title(f"{os.path.split(title)[1]} ({fraction:.0%} loaded)")
+
+        if new_rows:
+            appendRows(pd.concat(new_rows, ignore_index=True) if len(new_rows) > 1 else new_rows[0])
+        elif not loading:
+            fig.canvas.draw_idle()
+        if not loading and error is None:
+            finishBackgroundLoad()
+            print(f"\nLoaded {x_buffer.size} rows of {filename} in the background.")
+
+
+    def finishBackgroundLoad():
+        """
+        Trims the line buffers to the rows loaded and writes them to the cache. The loader hands every chunk over rather than
+        keeping its own copy for the cache, so the rows are only held once.
+        """
+        x_buffer.trim()
+        for line, y_buffer in y_buffers.items():
+            y_buffer.trim()
+            line_data[line] = (x_buffer.view(), y_buffer.view(), x_index)
+        if selected_line in range_stats:
+            range_stats[selected_line].extend(line_data[selected_line][1])
+
+        if use_cache:
+            values = {tickMs: x_buffer.view(), **{line_columns[line]: y_buffer.view() for line, y_buffer in y_buffers.items()}}
+            cache_columns = [column for x, column in enumerate(columns) if x in usecols]
+            if all(column in values for column in cache_columns): # Columns that could not be plotted were not kept.
+                writeCache(filename, downcastColumns(pd.DataFrame({column: values[column] for column in cache_columns}, copy=False)))
+
+
+    if loader is not None and line_data:
+        ax1.set_title(f"{os.path.split(title)[1]} (loading)")
+        loader_timer = fig.canvas.new_timer(interval=ASYNC_POLL_INTERVAL)
+        loader_timer.add_callback(timed('load update', onLoaderTimer))
+        loader_timer.start()
+        loader.start()
+        fig.canvas.mpl_connect('close_event', lambda event: (loader.cancel(), loader_timer.stop()))
+
+
+    #----------------------------------------------- STREAMING -----------------------------------------------
+
+
+    # The lines show the summary, or the full resolution rows read back from disk once the view is zoomed in far enough.
+    summary_data = dict(line_data)
+    detail_range = None
+
+    def selectStreamData():
+        """
+        Points each line at the summary or at the full resolution rows of the view, reading them from disk if the view has moved outside them.
+        """
+        nonlocal detail_range
+        # The summary is enough while it has a bin for every pixel, past that the rows are read if there are few enough of them.
+        x_min, x_max = ax1.get_xlim()
+        num_bins, num_rows = csv_stream.countInRange(x_min, x_max)
+        if num_bins >= ax1.bbox.width or num_rows > STREAM_DETAIL_ROWS:
+            line_data.update(summary_data)
+            detail_range = None
+            return
+        if detail_range is not None and detail_range[0] <= x_min and x_max <= detail_range[1]:
+            return
+
+        # Read a margin either side, so small pans do not go back to the file.
+        margin = (x_max - x_min) * 0.5
+        try:
+            detail = csv_stream.readRange(x_min - margin, x_max + margin)
+        except Exception as e:
+            print(f"Error reading {filename} - {e}", file=sys.stderr)
+            detail = None
+        if detail is None or len(detail) == 0:
+            line_data.update(summary_data)
+            detail_range = None
+            return
+        x_detail = detail[columns[1]].to_numpy()
+        x_index = buildXIndex(x_detail)
+        for line, column_name in line_columns.items():
+            line_data[line] = (x_detail, detail[column_name].to_numpy(), x_index)
+        detail_range = (x_detail[0], x_detail[-1])
+        pyramids.clear()
+
+
+    def updateStreamSummary():
+        """
+        Points the lines at the latest summary and refits the limits and the stats to it.
+        """
+        nonlocal max_abs_values
+        summary = csv_stream.frame()
+        x_summary = summary[columns[1]].to_numpy()
+        x_index = buildXIndex(x_summary)
+        for line, column_name in line_columns.items():
+            summary_data[line] = (x_summary, summary[column_name].to_numpy(), x_index)
+        pyramids.clear()
+
+        # The stats of the summary are those of the whole file read so far, as it keeps the minimum and maximum of every bin.
+        column_stats.clear()
+        max_abs_values = calculateMaxAbsValues(summary, columns, num_columns, ignore_cols, primary_cols, secondary_cols, tertiary_cols, quaternary_cols, column_stats)
+        if not rescale_visible:
+            setZeroAlignedLimits(ax1, ax2, ax3, ax4, max_abs_values)
+        return x_summary
+
+
+    def onStreamTimer():
+        """
+        Timer callback. Reads the next chunks of the file, then updates the overview and the progress in the title.
+        """
+        previous_x_last = csv_stream.chunks[-1][3] if csv_stream.chunks else -np.inf
+        showing_end = ax1.get_xlim()[1] >= previous_x_last
+        try:
+            fraction = csv_stream.readNext(STREAM_CHUNKS_PER_TICK)
+        except Exception as e:
+            print(f"\nError streaming {filename} - {e}", file=sys.stderr)
+            stream_timer.stop()
+            return
+
+        x_summary = updateStreamSummary()
+        if csv_stream.done:
+            stream_timer.stop()
+            ax1.set_title(os.path.split(title)[1])
+            print(f"\nStreamed {csv_stream.rows} rows of {filename} into {len(x_summary) // 2} bins of up to {csv_stream.bin_rows} rows.")
+        else:
+            ax1.set_title(f"{os.path.split(title)[1]} ({fraction:.0%} loaded)")
+            print(f"Streaming {filename}: {fraction:.0%}", end='\r')
+
+        # Keep the whole file in view while it loads, unless the user has zoomed in.
+        x_min, x_max = ax1.get_xlim()
+        if showing_end and len(x_summary) and np.nanmax(x_summary) > x_max:
+            ax1.set_xlim(x_min, np.nanmax(x_summary)) # Re-decimates through onViewChanged.
         else:
-            btn.on_clicked(lambda event, k=key, l=button_lines[key]: toggleVisibilityGroup(event, k, l))
+            onViewChanged()
+        fig.canvas.draw_idle()
+
+
+    if csv_stream is not None and not csv_stream.done:
+        ax1.set_title(f"{os.path.split(title)[1]} (loading)")
+        stream_timer = fig.canvas.new_timer(interval=1)
+        stream_timer.add_callback(timed('stream update', onStreamTimer))
+        stream_timer.start()
+        fig.canvas.mpl_connect('close_event', lambda event: stream_timer.stop())
 
 
     #----------------------------------------------- SHOW -----------------------------------------------
 
 
+    if profiler: profiler.begin('first draw') # Ended by the first draw event.
+    if not show:
+        return
+
     try:
         plt.show()
     except Exception as e:
         print(f"Error displaying plot: {e}", file=sys.stderr)
 
 
-if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Missing parameters")
-        sys.exit(1)
+#----------------------------------------------- SERVER -----------------------------------------------
+
+
+def writeAuthKey(auth_key):
+    """
+    Writes the key that clients must present to the server. The file is only readable by the current user.
+
+    Args:
+        auth_key: The key as bytes.
+    """
+    fd = os.open(AUTH_KEY_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(auth_key)
+
+
+def acceptConnections(listener, requests):
+    """
+    Receives file names from clients and queues them for the GUI thread. Runs in a background thread.
+
+    Args:
+        listener:   The multiprocessing.connection Listener.
+        requests:   Queue the file names are put on.
+    """
+    while True:
+        try:
+            conn = listener.accept()
+        except (OSError, AuthenticationError) as e:
+            print(f"Rejected plotter client - {e}", file=sys.stderr)
+            continue
+
+        with conn:
+            try:
+                while True:
+                    command, filename = conn.recv()
+                    if command == 'open':
+                        requests.put(filename)
+                    conn.send('ok')
+            except EOFError:
+                pass # Client finished sending.
+            except Exception as e:
+                print(f"Error reading from plotter client - {e}", file=sys.stderr)
+
+
+def runServer(filenames, use_cache=True, poll_interval=0.1, low_memory=False, async_load=False):
+    """
+    Runs a long lived plotter which opens a new figure window for every file sent to it by plotter_client.py.
+    Python, pandas and matplotlib are then only imported once, so opening a file costs only the parsing and plotting.
 
-    filename = sys.argv[1]
-    createPlot(filename)
\ No newline at end of file
+    Args:
+        filenames:      List of files to open straight away.
+        use_cache:      Whether to use the binary column cache.
+        poll_interval:  Seconds between checks for new files, while the GUI event loop runs.
+        low_memory:     Whether to open every figure in low memory mode, see createPlot.
+        async_load:     Whether to show every window straight away and parse its file in the background, see createPlot.
+    """
+    auth_key = os.urandom(32)
+    try:
+        listener = Listener(SERVER_ADDRESS, authkey=auth_key)
+    except OSError:
+        # Another server is already running, hand the files over to it instead. Its key is left untouched.
+        if filenames and not sendFiles(filenames):
+            print(f"Plotter server address {SERVER_ADDRESS} is in use", file=sys.stderr)
+        return
+    writeAuthKey(auth_key)
+
+    print(f"Plotter server listening on {SERVER_ADDRESS[0]}:{SERVER_ADDRESS[1]}")
+    requests = queue.Queue()
+    for filename in filenames:
+        requests.put(filename)
+    threading.Thread(target=acceptConnections, args=(listener, requests), daemon=True).start()
+
+    import matplotlib.pyplot as plt
+
+    # Figures can only be created on the main thread, which also has to keep the GUI event loop running.
+    while True:
+        try:
+            filename = requests.get_nowait()
+        except queue.Empty:
+            filename = None
+
+        if filename is not None:
+            createPlot(filename, use_cache=use_cache, show=False, low_memory=low_memory, async_load=async_load)
+            plt.show(block=False)
+        elif plt.get_fignums():
+            # Unlike plt.pause, this neither redraws the current figure nor raises its window over the others.
+            plt.gcf().canvas.start_event_loop(poll_interval)
+        else:
+            time.sleep(poll_interval)
+
+
+def profileStartup():
+    """
+    Reports how long each module used by the plotter takes to import. The modules are imported one after another in a fresh interpreter,
+    so each time only includes what the modules before it had not already loaded.
+    """
+    code = (
+        "import importlib, json, time\n"
+        "timings = []\n"
+        f"for name in {STARTUP_MODULES!r}:\n"
+        "    start = time.perf_counter()\n"
+        "    importlib.import_module(name)\n"
+        "    timings.append((name, time.perf_counter() - start))\n"
+        "print(json.dumps(timings))\n"
+    )
+    try:
+        result = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True)
+        timings = json.loads(result.stdout.splitlines()[-1])
+    except Exception as e:
+        print(f"Error profiling start up - {e}", file=sys.stderr)
+        return
+
+    print(f"\nStart up import times:")
+    for name, elapsed in timings:
+        print(f"{elapsed * 1000:9.1f} ms  {name}")
+    print(f"{sum(elapsed for _, elapsed in timings) * 1000:9.1f} ms  Total\n")
+
+
+def parseArguments(argv):
+    """
+    Parses the command line arguments.
+
+    Args:
+        argv: List of command line arguments, excluding the script name.
+
+    Returns:
+        The parsed argparse namespace.
+    """
+    parser = argparse.ArgumentParser(description="Plots CSV files with up to four y-axes.")
+    parser.add_argument('files', nargs='*', help="CSV file to plot. Several files or glob patterns can be given with --export.")
+    parser.add_argument('--export', metavar='DIR', help="Render the files to DIR without opening a window, instead of plotting interactively.")
+    parser.add_argument('--format', nargs='+', default=['png'], choices=['png', 'svg', 'pdf'], help="File format(s) to export (default: png).")
+    parser.add_argument('--workers', type=int, default=None, help="Number of export worker processes (default: number of CPU cores).")
+    parser.add_argument('--no-cache', action='store_true', help="Always parse the CSV files instead of using the binary cache.")
+    parser.add_argument('--reset-view', action='store_true', help="Open the file with the default view, instead of the one saved when it was last closed.")
+    parser.add_argument('--engine', choices=LOAD_ENGINES, default='auto', help="CSV parser: pyarrow's multithreaded reader, the file split into byte ranges parsed in parallel threads, "
+        "or pandas on one thread (default: auto, pyarrow if installed, otherwise split for large files).")
+    parser.add_argument('--follow', nargs='?', type=int, const=1000, default=None, metavar='MS', help="Keep plotting rows appended to the file, polling every MS milliseconds (default: 1000).")
+    parser.add_argument('--rescale-visible', action='store_true', help="Fit the Y-axes to the visible lines in the visible x-range whenever lines are hidden or the view is zoomed.")
+    parser.add_argument('--ui-stats', action='store_true', help="Time every UI action (legend pick, click, hover, zoom, buttons) and print a summary when the window is closed.")
+    parser.add_argument('--overlay', action='store_true', help="Plot all the files over each other, aligned to the ticks of the first file (the baseline).")
+    parser.add_argument('--diff', action='store_true', help="With --overlay, also plot the difference of each column from the baseline.")
+    parser.add_argument('--async-load', action='store_true', help="Show the window straight away and parse the file in a background thread, drawing the rows as they arrive.")
+    parser.add_argument('--stream', action='store_true', help="Read the file a chunk at a time into a fixed size overview, for files larger than memory. Zooming in reads the rows in view back from the file.")
+    parser.add_argument('--window', nargs=2, type=float, metavar=('T0', 'T1'), help="Only read and plot the rows with ticks from T0 to T1, using a row index saved next to the file.")
+    parser.add_argument('--low-memory', action='store_true', help="Keep one shared read-only tick array and float32 (or int16 where lossless) copies of the columns, "
+        "release the parsed data once the lines are drawn, and print the peak memory use.")
+    parser.add_argument('--derive', action='append', default=[], metavar='NAME[:N]=EXPR', help="Plot a column computed from the others, e.g. 'Speed Error:2={Target Speed}-{Current Speed}'. "
+        "Functions: abs, sqrt, exp, log, sin, cos, minimum, maximum, where, diff, ddt, integral and movavg(x, n). Can be given several times.")
+    parser.add_argument('--derive-file', metavar='FILE', help="Read --derive definitions from FILE, one per line.")
+    parser.add_argument('--profile', action='store_true', help="Print the time and peak memory of each stage of opening the plot, and the p50/p99 latency of every UI action when the window is closed.")
+    parser.add_argument('--profile-output', metavar='JSON', help="Also write the --profile results to a JSON file when the window is closed.")
+    parser.add_argument('--cprofile', metavar='FILE', help="Run the plot under cProfile, save the stats to FILE and print the slowest functions.")
+    parser.add_argument('--server', action='store_true', help="Stay running and open a window for each file sent by plotter_client.py.")
+    parser.add_argument('--profile-startup', action='store_true', help="Report the import time of each module, and the time to first window if a file is given.")
+    args = parser.parse_args(argv)
+
+    try:
+        args.derived_definitions = (readDerivedFile(args.derive_file) if args.derive_file else []) + [parseDerivedDefinition(text) for text in args.derive]
+    except (OSError, ValueError) as e:
+        parser.error(f"--derive: {e}")
+
+    if args.server:
+        if args.export is not None or args.follow is not None or args.overlay or args.stream or args.window or args.derived_definitions:
+            parser.error("--server cannot be used with --export, --follow, --overlay, --stream, --window or --derive")
+        if args.async_load and args.low_memory:
+            parser.error("--async-load cannot be used with --low-memory")
+        return args
+    if args.profile_startup and not args.files:
+        return args
+    if args.diff and not args.overlay:
+        parser.error("--diff can only be used with --overlay")
+    if args.window and (args.follow is not None or args.overlay or args.stream):
+        parser.error("--window cannot be used with --follow, --overlay or --stream")
+    if args.window and args.window[0] > args.window[1]:
+        parser.error("--window T0 must not be after T1")
+    if args.stream and (args.export is not None or args.follow is not None or args.overlay):
+        parser.error("--stream cannot be used with --export, --follow or --overlay")
+    if args.derived_definitions and (args.follow is not None or args.overlay or args.stream):
+        parser.error("--derive cannot be used with --follow, --overlay or --stream")
+    if args.low_memory and (args.export is not None or args.follow is not None or args.stream):
+        parser.error("--low-memory cannot be used with --export, --follow or --stream")
+    if args.async_load and (args.export is not None or args.follow is not None or args.overlay or args.stream or args.window or args.derived_definitions or args.low_memory):
+        parser.error("--async-load cannot be used with --export, --follow, --overlay, --stream, --window, --derive or --low-memory")
+    if args.overlay:
+        if args.export is not None or args.follow is not None:
+            parser.error("--overlay cannot be used with --export or --follow")
+        if len(args.files) < 2:
+            parser.error("--overlay needs at least two files")
+        return args
+    if args.export is None and len(args.files) != 1:
+        parser.error("only one file can be plotted interactively, use --export for several files")
+    if args.export is not None and args.follow is not None:
+        parser.error("--follow cannot be used with --export")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+    return args
+
+
+if __name__ == "__main__":
+    args = parseArguments(sys.argv[1:])
+
+    startup_time = None
+    if args.profile_startup:
+        # The report runs in its own interpreter, so leave its duration out of the time to first window.
+        import_time = time.perf_counter() - START_TIME
+        profileStartup()
+        if not args.files:
+            sys.exit(0)
+        startup_time = time.perf_counter() - import_time
+
+    if args.server:
+        runServer(args.files, use_cache=not args.no_cache, low_memory=args.low_memory, async_load=args.async_load)
+        sys.exit(0)
+
+    if args.export is not None:
+        filenames = expandFileArguments(args.files)
+        if not filenames:
+            sys.exit(1)
+        sys.exit(1 if exportPlots(filenames, args.export, args.format, args.workers, not args.no_cache, args.window, args.derived_definitions, args.engine) else 0)
+
+    plot_options = dict(use_cache=not args.no_cache, follow_interval=args.follow, startup_time=startup_time, rescale_visible=args.rescale_visible,
+        ui_stats=args.ui_stats, overlay_files=args.files[1:] if args.overlay else None, show_diff=args.diff, stream=args.stream, window=args.window,
+        profile=args.profile, profile_output=args.profile_output, derived=DerivedSignals(args.derived_definitions) if args.derived_definitions else None, engine=args.engine,
+        low_memory=args.low_memory, restore_session=not args.reset_view, async_load=args.async_load
+    )
+    if args.cprofile:
+        import cProfile
+        import pstats
+        profile = cProfile.Profile()
+        profile.runcall(createPlot, args.files[0], **plot_options)
+        profile.dump_stats(args.cprofile)
+        print(f"\ncProfile stats written to {args.cprofile}, the slowest functions were:")
+        pstats.Stats(profile).sort_stats('cumulative').print_stats(20)
+    else:
+        createPlot(args.files[0], **plot_options)
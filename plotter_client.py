@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+
+
+# This launcher only uses the standard library, so it starts in a fraction of the time it takes to import pandas and matplotlib.
+SERVER_ADDRESS = ('127.0.0.1', 47831)
+AUTH_KEY_FILE = os.path.join(os.path.expanduser('~'), '.csvplotter_server.key')
+PLOTTER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'plotter.py')
+
+
+def readAuthKey():
+    """
+    Reads the key the running server uses to authenticate clients.
+
+    Returns:
+        The key as bytes, or None if no server has written one.
+    """
+    try:
+        with open(AUTH_KEY_FILE, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def sendFiles(filenames):
+    """
+    Asks the running plotter server to open each file in a new window.
+
+    Args:
+        filenames: List of CSV file names.
+
+    Returns:
+        True if the server received every file, False if no server is running.
+    """
+    auth_key = readAuthKey()
+    if not auth_key:
+        return False
+
+    try:
+        with Client(SERVER_ADDRESS, authkey=auth_key) as conn:
+            for filename in filenames:
+                conn.send(('open', os.path.abspath(filename)))
+                conn.recv()
+    except (OSError, EOFError, AuthenticationError):
+        return False
+    return True
+
+
+def startServer(filenames):
+    """
+    Starts a plotter server in the background which opens the files, then stays running to receive later ones.
+
+    Args:
+        filenames: List of CSV file names.
+    """
+    # Use pythonw on Windows so the server does not keep a console window open.
+    executable = sys.executable
+    pythonw = os.path.join(os.path.dirname(executable), 'pythonw.exe')
+    if os.name == 'nt' and os.path.isfile(pythonw):
+        executable = pythonw
+
+    command = [executable, PLOTTER_SCRIPT, '--server'] + [os.path.abspath(filename) for filename in filenames]
+    if os.name == 'nt':
+        subprocess.Popen(command, creationflags=subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP, close_fds=True)
+    else:
+        subprocess.Popen(command, start_new_session=True, close_fds=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Missing parameters")
+        sys.exit(1)
+
+    filenames = sys.argv[1:]
+    if not sendFiles(filenames):
+        startServer(filenames)